@@ -4,9 +4,11 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
-from src.config import get_model, get_tools
+from src.config import get_model, get_prompt_cache, get_tools
 from src.journal_analysis_graph import JournalAnalysisGraph
 from src.utils.slack import get_slack_messages
+from src.utils.slack_export import import_slack_export
+from src.utils.slack_directory import SlackDirectory, make_web_api_refresher
 
 logger = logging.getLogger(__name__)
 
@@ -29,17 +31,39 @@ def main():
     llm = get_model()
     tools = get_tools()
     
+    # ユーザー・チャンネル名のキャッシュ（トークンがあれば未登録のIDをSlack APIで解決する）
+    bot_token = os.getenv("SLACK_BOT_TOKEN")
+    slack_directory = SlackDirectory(
+        refresher=make_web_api_refresher(bot_token) if bot_token else None
+    )
+    
     # グラフの初期化
-    graph = JournalAnalysisGraph(llm=llm, tools=tools)
+    graph = JournalAnalysisGraph(
+        llm=llm,
+        tools=tools,
+        slack_directory=slack_directory,
+        prompt_cache=get_prompt_cache()
+    )
     
-    # Slackメッセージの取得
-    journal_text = get_slack_messages()
+    # ノードごとのプロファイル（PROFILE_NODES=trueで有効化）
+    profile = os.getenv("PROFILE_NODES", "").lower() == "true"
     
-    # グラフの実行
-    final_state = graph.invoke(
-        journal_text=journal_text,
-        debug=True
-    )
+    # Slackメッセージの取得
+    export_path = os.getenv("SLACK_EXPORT_PATH")
+    if export_path:
+        # エクスポートからはメッセージレコード単位で渡し、会話ごとに要約する
+        export = import_slack_export(export_path, directory=slack_directory)
+        final_state = graph.invoke(
+            messages=export["messages"],
+            debug=True,
+            profile=profile
+        )
+    else:
+        final_state = graph.invoke(
+            journal_text=get_slack_messages(),
+            debug=True,
+            profile=profile
+        )
     
     # 結果の確認
     if final_state.get("report_file"):
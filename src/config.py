@@ -1,9 +1,10 @@
 import os
 from langchain_google_vertexai import ChatVertexAI
 from langchain_community.tools.tavily_search import TavilySearchResults
-from typing import List
+from typing import List, Optional
 from langchain_core.tools import BaseTool
 import vertexai
+from src.utils.prompt_cache import PromptCache, VertexPromptCache
 
 def init_vertex_ai():
     """Vertex AI SDKの初期化"""
@@ -39,6 +40,17 @@ def get_model(temperature: float = 0):
         max_retries=2
     )
 
+def get_prompt_cache() -> Optional[PromptCache]:
+    """システムプロンプトのキャッシュの設定
+    
+    PROMPT_CACHE_MODEが"vertex"ならVertex AIのコンテキストキャッシュを使う。
+    未設定の場合は毎回システムプロンプトを送信する。
+    """
+    mode = os.getenv("PROMPT_CACHE_MODE")
+    if mode == "vertex":
+        return VertexPromptCache()
+    return None
+
 def get_tools() -> List[BaseTool]:
     """使用するツールの設定"""
     return [TavilySearchResults(max_results=3)]
@@ -1,12 +1,22 @@
-from typing import Any, Dict
+import os
+import json
+import hashlib
+from typing import Any, Dict, List, Optional
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import END, StateGraph
 from .states import JournalAnalysisState
 from .nodes.summary_generator import SummaryGenerator
+from .nodes.topic_segmenter import TopicSegmenter
 from .nodes.discussion_extractor import DiscussionExtractor
 from .nodes.query_generator import QueryGenerator
 from .utils.file_handler import save_final_report
 from .utils.slack import send_to_slack
+from .utils.blob_store import BlobStore
+from .utils.singleflight import SingleFlight, default_singleflight
+from .utils.slack_directory import SlackDirectory, USERS
+from .utils.prompt_cache import PromptCache, PromptUsageTracker
+from .utils.profiling import NodeProfiler
+from .models.states import SlackMessage
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,32 +28,73 @@ class JournalAnalysisGraph:
     def __init__(
         self,
         llm: ChatGoogleGenerativeAI,
-        tools: list
+        tools: list,
+        blob_store: Optional[BlobStore] = None,
+        singleflight: Optional[SingleFlight] = None,
+        slack_directory: Optional[SlackDirectory] = None,
+        prompt_cache: Optional[PromptCache] = None
     ):
         """初期化
         
         Args:
             llm: Gemini-1.5-proモデル
             tools: 使用するツールのリスト（現在は未使用）
+            blob_store: ログや要約の本文を保存するBlobストア
+            singleflight: 同一入力の同時実行をまとめるインスタンス（省略時はプロセス内で共有）
+            slack_directory: 指定時は要約の前にメンションやチャンネル参照を表示名に置き換える
+            prompt_cache: 指定時は各ノードのシステムプロンプトをキャッシュに登録して再利用する
         """
+        self.blob_store = blob_store or BlobStore()
+        self.singleflight = singleflight or default_singleflight
+        self.slack_directory = slack_directory
+        self.llm = llm
+        self.prompt_usage = PromptUsageTracker()
+        
         # ノードの初期化
-        self.summary_generator = SummaryGenerator(llm=llm)
-        self.discussion_extractor = DiscussionExtractor(llm=llm)
-        self.query_generator = QueryGenerator(llm=llm)
+        self.topic_segmenter = TopicSegmenter()
+        node_options = {"prompt_cache": prompt_cache, "usage_tracker": self.prompt_usage}
+        self.summary_generator = SummaryGenerator(llm=llm, **node_options)
+        self.discussion_extractor = DiscussionExtractor(llm=llm, **node_options)
+        self.query_generator = QueryGenerator(llm=llm, **node_options)
         
         # グラフの構築
         self.graph = self._create_graph()
+        self.config_fingerprint = self._fingerprint_config()
+        
+    def _fingerprint_config(self) -> str:
+        """結果に影響するパイプライン設定（モデルのパラメータ、プロンプト、分割条件）のハッシュ値を求める"""
+        config = {
+            "llm": type(self.llm).__name__,
+            "llm_params": getattr(self.llm, "_identifying_params", {}),
+            "prompts": [
+                self.summary_generator.system_prompt,
+                self.summary_generator.segment_system_prompt,
+                self.discussion_extractor.system_prompt,
+                self.query_generator.system_prompt,
+            ],
+            "segmenter": vars(self.topic_segmenter),
+            # 結果のハンドルは保存先のBlobストアでのみ有効なため、保存先ごとに分ける
+            "blob_store": os.path.abspath(self.blob_store.directory),
+        }
+        encoded = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+    
+    def _create_graph(self, profiler: Optional[NodeProfiler] = None) -> StateGraph:
+        """グラフを構築する
+        
+        Args:
+            profiler: 指定時は各ノードをプロファイル付きで実行する
+        """
+        wrap = profiler.wrap if profiler is not None else (lambda name, fn: fn)
         
-    def _create_graph(self) -> StateGraph:
-        """グラフを構築する"""
         # グラフの初期化
         graph = StateGraph(JournalAnalysisState)
         
         # ノードの追加
-        graph.add_node("generate_summary", self._generate_summary)
-        graph.add_node("extract_discussion", self._extract_discussion)
-        graph.add_node("generate_query", self._generate_queries)
-        graph.add_node("create_report", self._create_report)
+        graph.add_node("generate_summary", wrap("generate_summary", self._generate_summary))
+        graph.add_node("extract_discussion", wrap("extract_discussion", self._extract_discussion))
+        graph.add_node("generate_query", wrap("generate_query", self._generate_queries))
+        graph.add_node("create_report", wrap("create_report", self._create_report))
         
         # エントリーポイントの設定
         graph.set_entry_point("generate_summary")
@@ -58,15 +109,25 @@ class JournalAnalysisGraph:
     
     def _generate_summary(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """要約生成ノード"""
-        result = self.summary_generator.run(state["journal_text"])
+        if state.get("messages_ref"):
+            # メッセージレコードがある場合は会話単位に分割して並列に要約する
+            messages = [
+                SlackMessage.model_validate(m)
+                for m in self.blob_store.get_json(state["messages_ref"])
+            ]
+            segments = self.topic_segmenter.run(messages)["segments"]
+            result = self.summary_generator.run_segments(segments)
+        else:
+            result = self.summary_generator.run(self.blob_store.get_text(state["journal_ref"]))
         return {
-            "summary": result["summary"],
-            "summary_file": result["summary_file"]
+            "summary_ref": self.blob_store.put_text(result["summary"]),
+            "summary_file": result["summary_file"],
+            "skipped_segments": result.get("skipped_segments", 0)
         }
     
     def _extract_discussion(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """ディスカッションポイント抽出ノード"""
-        result = self.discussion_extractor.run(state["summary"])
+        result = self.discussion_extractor.run(self.blob_store.get_text(state["summary_ref"]))
         return {
             "discussion_points": result["discussion_points"],
             "discussion_points_file": result["discussion_points_file"]
@@ -83,7 +144,7 @@ class JournalAnalysisGraph:
     def _create_report(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """最終レポートを作成する"""
         report_file = save_final_report(
-            summary=state["summary"],
+            summary=self.blob_store.get_text(state["summary_ref"]),
             discussion_points=state["discussion_points"],
             research_queries=state["research_queries"]
         )
@@ -95,32 +156,95 @@ class JournalAnalysisGraph:
         # Slackに送信
         slack_result = send_to_slack(report_content)
         
+        # 変更したキーのみを返し、状態全体はコピーしない
         return {
-            **state,
             "report_file": report_file,
             "slack_success": slack_result["success"]
         }
     
     def invoke(
         self,
-        journal_text: str,
-        debug: bool = False
+        journal_text: Optional[str] = None,
+        messages: Optional[List[SlackMessage]] = None,
+        debug: bool = False,
+        coalesce: bool = True,
+        profile: bool = False
     ) -> JournalAnalysisState:
         """グラフを実行する
         
         Args:
             journal_text: 分析対象のSlackログ
+            messages: 分析対象のメッセージレコード（指定時は会話単位で要約する）
             debug: デバッグモードを有効にするかどうか
+            coalesce: 同じ入力・設定の実行中または直近の結果があれば、それを共有するかどうか
+            profile: ノードごとのCPUサンプリングとメモリ割り当てを記録するかどうか（有効時は集約しない）
             
         Returns:
             JournalAnalysisState: 最終的な状態
         """
-        # 初期状態の作成
-        initial_state = JournalAnalysisState(journal_text=journal_text)
+        if journal_text is None and messages is None:
+            raise ValueError("Either journal_text or messages must be provided")
+        
+        # メンション・チャンネル参照・リンクを表示名に置き換え、投稿者名の無いメッセージは補完する
+        if self.slack_directory is not None:
+            if messages is not None:
+                resolve = self.slack_directory.resolve
+                lookup = self.slack_directory.lookup
+                messages = [
+                    m.model_copy(update={
+                        "text": resolve(m.text),
+                        "user_name": m.user_name or (lookup(USERS, m.user) if m.user else None),
+                    })
+                    for m in messages
+                ]
+            if journal_text is not None:
+                journal_text = self.slack_directory.resolve(journal_text)
+            self.slack_directory.save()
+        
+        # 古いBlobの削除（一定間隔でのみ実行される）
+        self.blob_store.prune()
+        
+        # 初期状態の作成（本文はBlobストアに置き、状態にはハンドルのみを持たせる）
+        # メッセージレコードがある場合は要約ノードがそちらを使うため、テキストは保存しない
+        if messages is not None:
+            initial_state = JournalAnalysisState(
+                messages_ref=self.blob_store.put_json([m.model_dump() for m in messages])
+            )
+        else:
+            initial_state = JournalAnalysisState(journal_ref=self.blob_store.put_text(journal_text))
         
         try:
             # グラフの実行
-            final_state = self.graph.invoke(initial_state)
+            if profile:
+                # プロファイル用にノードを包んだグラフで実行し、結果を実行ディレクトリに保存する
+                # プロファイルの保存に失敗しても実行結果は返す
+                profiler = NodeProfiler()
+                try:
+                    with profiler:
+                        final_state = self._create_graph(profiler).invoke(initial_state)
+                finally:
+                    try:
+                        profile_dir = profiler.save()
+                    except Exception as e:
+                        logger.warning(f"Failed to save node profiles: {str(e)}")
+                        profile_dir = None
+                final_state["profile_dir"] = profile_dir
+            elif coalesce:
+                # 入力のハッシュ（Blobハンドル）と設定のハッシュが同じ実行はひとつにまとめる
+                key = hashlib.sha256("|".join([
+                    initial_state.get("messages_ref") or initial_state["journal_ref"],
+                    self.config_fingerprint,
+                ]).encode("utf-8")).hexdigest()
+                # Slackへの配信に失敗した結果や一部の会話が欠けた要約はキャッシュせず、再実行できるようにする
+                final_state = dict(self.singleflight.do(
+                    key,
+                    lambda: self.graph.invoke(initial_state),
+                    cacheable=lambda state: (
+                        bool(state.get("slack_success")) and not state.get("skipped_segments")
+                    )
+                ))
+            else:
+                final_state = self.graph.invoke(initial_state)
             
             if debug:
                 logger.info("=== Debug Information ===")
@@ -129,6 +253,14 @@ class JournalAnalysisGraph:
                 logger.info(f"Queries File: {final_state.get('queries_file')}")
                 logger.info(f"Final Report: {final_state.get('report_file')}")
                 logger.info(f"Slack Delivery: {'Success' if final_state.get('slack_success') else 'Failed'}")
+                if final_state.get("profile_dir"):
+                    logger.info(f"Profile Directory: {final_state.get('profile_dir')}")
+                for name, usage in self.prompt_usage.usage.items():
+                    logger.info(
+                        f"Prompt Usage [{name}]: setup {usage['setup_seconds'] * 1000:.2f} ms, "
+                        f"{usage['calls']} calls, {usage['input_tokens']} input tokens "
+                        f"({usage['cached_input_tokens']} cached)"
+                    )
             
             return final_state
             
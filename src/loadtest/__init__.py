@@ -0,0 +1,3 @@
+"""
+負荷試験・耐久試験用のハーネス
+"""
@@ -0,0 +1,46 @@
+import argparse
+import logging
+
+from src.loadtest.runner import run_load_test
+
+
+def main():
+    """負荷試験のエントリーポイント"""
+    parser = argparse.ArgumentParser(description="JournalAnalysisGraphの負荷試験・耐久試験")
+    parser.add_argument("--concurrency", type=int, default=4, help="同時に実行するグラフの数")
+    parser.add_argument("--duration", type=float, default=60, help="試験時間（秒）")
+    parser.add_argument("--messages", type=int, default=200, help="1回の実行あたりのメッセージ数")
+    parser.add_argument("--use-messages", action="store_true", help="メッセージレコードで渡し、会話単位の並列要約を使う")
+    parser.add_argument("--model-latency", type=float, default=0.5, help="モデルの平均遅延（秒）")
+    parser.add_argument("--model-error-rate", type=float, default=0.0, help="モデルが例外を送出する確率")
+    parser.add_argument("--webhook-latency", type=float, default=0.05, help="Webhookの平均遅延（秒）")
+    parser.add_argument("--webhook-error-rate", type=float, default=0.0, help="Webhookが500エラーを返す確率")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="リソース使用量の記録間隔（秒）")
+    parser.add_argument("--prompt-cache", action="store_true", help="システムプロンプトのキャッシュ（ローカルの代替実装）を使う")
+    parser.add_argument("--output-dir", default="outputs/loadtest", help="結果の保存先ディレクトリ")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logging.getLogger("src.loadtest").setLevel(logging.INFO)
+
+    result = run_load_test(
+        concurrency=args.concurrency,
+        duration_seconds=args.duration,
+        message_count=args.messages,
+        use_messages=args.use_messages,
+        model_latency_seconds=args.model_latency,
+        model_error_rate=args.model_error_rate,
+        webhook_latency_seconds=args.webhook_latency,
+        webhook_error_rate=args.webhook_error_rate,
+        sample_interval_seconds=args.sample_interval,
+        use_prompt_cache=args.prompt_cache,
+        output_directory=args.output_dir
+    )
+    print(f"Report: {result['report_file']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import json
+import random
+import time
+from typing import Any, List, Optional
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+SUMMARY_RESPONSE = """# 週間ディスカッション要約
+
+## 主要な議論
+- 負荷試験用のトピック
+  - 賛成意見：...
+  - 反対意見：...
+
+## 技術的な検討事項
+- 負荷試験用の課題
+  - 現状：...
+"""
+
+SEGMENT_RESPONSE = json.dumps({
+    "main_discussions": ["負荷試験用のトピック\n  - 未解決の点：..."],
+    "technical_considerations": ["負荷試験用の課題\n  - 提案された解決策：..."]
+}, ensure_ascii=False)
+
+DISCUSSION_POINTS_RESPONSE = json.dumps({
+    "points": ["負荷試験用のディスカッションポイント1", "負荷試験用のディスカッションポイント2"],
+    "context": "負荷試験用のコンテキスト"
+}, ensure_ascii=False)
+
+QUERIES_RESPONSE = json.dumps({
+    "queries": [
+        {
+            "discussion_point": "負荷試験用のディスカッションポイント1",
+            "research_query": "Find evidence for the load test discussion point."
+        }
+    ]
+}, ensure_ascii=False)
+
+
+def _count_tokens(text: str) -> int:
+    """トークン数を概算する（1トークン≒4文字）"""
+    return max(1, len(text) // 4)
+
+
+class FakeChatModel(BaseChatModel):
+    """遅延とエラー率を設定できる負荷試験用のチャットモデル
+
+    各ノードのプロンプトに応じて、出力パーサーが受け付ける固定の応答を返す。
+    `cached_content`が渡された場合は、先頭のシステムメッセージをキャッシュ済みの入力として数える。
+    """
+
+    latency_seconds: float = 0.5
+    """応答までの平均遅延（秒）"""
+    error_rate: float = 0.0
+    """例外を送出する確率"""
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-load-test-chat-model"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        cached_content: Optional[str] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(random.uniform(0.5, 1.5) * self.latency_seconds)
+        if random.random() < self.error_rate:
+            raise RuntimeError("Injected fake model error")
+
+        prompt = str(messages[-1].content)
+        if prompt.startswith("以下のSlackログを要約"):
+            response = SUMMARY_RESPONSE
+        elif prompt.startswith("以下の会話ログを要約"):
+            response = SEGMENT_RESPONSE
+        elif prompt.startswith("以下の要約からディスカッションポイント"):
+            response = DISCUSSION_POINTS_RESPONSE
+        else:
+            response = QUERIES_RESPONSE
+
+        input_tokens = sum(_count_tokens(str(m.content)) for m in messages)
+        cached_tokens = 0
+        if cached_content and isinstance(messages[0], SystemMessage):
+            cached_tokens = _count_tokens(str(messages[0].content))
+        output_tokens = _count_tokens(response)
+        message = AIMessage(
+            content=response,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+                "input_token_details": {"cache_read": cached_tokens},
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
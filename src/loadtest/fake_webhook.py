@@ -0,0 +1,73 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FakeWebhookServer:
+    """Slack Incoming Webhookを模したローカルのHTTPサーバー"""
+
+    def __init__(self, latency_seconds: float = 0.05, error_rate: float = 0.0):
+        """初期化
+
+        Args:
+            latency_seconds: 応答までの平均遅延（秒）
+            error_rate: 500エラーを返す確率
+        """
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self.request_count = 0
+        self.error_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """WebhookのURL"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/services/fake"
+
+    def _make_handler(self) -> type:
+        """リクエストハンドラーを作成する"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep(random.uniform(0.5, 1.5) * server.latency_seconds)
+                failed = random.random() < server.error_rate
+                with server._lock:
+                    server.request_count += 1
+                    server.error_count += int(failed)
+                if failed:
+                    self.send_response(500)
+                    self.end_headers()
+                    self.wfile.write(b"internal_error")
+                    return
+                json.loads(body)
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeWebhookServer":
+        """サーバーを起動する"""
+        self._thread.start()
+        logger.info(f"Started fake webhook: {self.url}")
+        return self
+
+    def stop(self) -> None:
+        """サーバーを停止する"""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
@@ -0,0 +1,32 @@
+import math
+import hashlib
+from typing import Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import SystemMessage
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from src.loadtest.fake_model import FakeChatModel
+from src.utils.prompt_cache import PromptCache
+
+
+class LocalPromptCache(PromptCache):
+    """FakeChatModel専用のプロンプトキャッシュ（テストや負荷試験用）
+
+    システムプロンプトはモデル側で保持されたものとして扱い、呼び出し時に先頭に付け直して
+    `cached_content`にハンドルを渡す。モデルはハンドルがあれば先頭のシステムメッセージを
+    キャッシュ済みの入力として数える。ハンドルに有効期限は無い。
+    実在しないハンドルを本物のモデルに渡さないよう、FakeChatModel以外には使えない。
+    """
+
+    def bind(self, llm: BaseChatModel, system_prompt: str) -> Runnable:
+        if not isinstance(llm, FakeChatModel):
+            raise TypeError(f"LocalPromptCache only supports FakeChatModel, got {type(llm).__name__}")
+        return super().bind(llm, system_prompt)
+
+    def _create(self, llm: BaseChatModel, system_prompt: str) -> Tuple[str, float]:
+        handle = f"local-{hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:16]}"
+        return handle, math.inf
+
+    def _bind_handle(self, llm: BaseChatModel, handle: str, prefix: SystemMessage) -> Runnable:
+        return RunnableLambda(lambda prompt: [prefix, *prompt.to_messages()]) | llm.bind(cached_content=handle)
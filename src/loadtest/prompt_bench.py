@@ -0,0 +1,115 @@
+import os
+import time
+import argparse
+from typing import Any, Dict, Optional
+import logging
+
+from langchain_core.output_parsers import StrOutputParser
+from src.journal_analysis_graph import JournalAnalysisGraph
+from src.loadtest.fake_model import FakeChatModel
+from src.loadtest.fake_webhook import FakeWebhookServer
+from src.loadtest.local_prompt_cache import LocalPromptCache
+from src.loadtest.runner import make_messages, restore_environ
+from src.utils.file_handler import save_json
+from src.utils.prompt_cache import PromptCache, build_chain
+
+logger = logging.getLogger(__name__)
+
+
+def measure_chain_setup(iterations: int = 1000) -> Dict[str, float]:
+    """チェーンの構築1回あたりの時間を計測する
+
+    以前は呼び出しごとに構築していたため、この時間が呼び出し1回あたりのオーバーヘッドだった。
+
+    Args:
+        iterations: 計測の繰り返し回数
+
+    Returns:
+        Dict[str, float]: ノードごとの構築時間（マイクロ秒）
+    """
+    graph = JournalAnalysisGraph(llm=FakeChatModel(latency_seconds=0), tools=[])
+    nodes = {
+        "generate_summary": (graph.summary_generator.system_prompt, "{text}", StrOutputParser()),
+        "extract_discussion": (graph.discussion_extractor.system_prompt, "{summary}", graph.discussion_extractor.output_parser),
+        "generate_query": (graph.query_generator.system_prompt, "{points}\n{context}", graph.query_generator.output_parser),
+    }
+    results = {}
+    for name, (system_prompt, human_template, output_parser) in nodes.items():
+        start = time.perf_counter()
+        for _ in range(iterations):
+            build_chain(name, graph.llm, system_prompt, human_template, output_parser)
+        results[name] = (time.perf_counter() - start) / iterations * 1e6
+    return results
+
+
+def measure_prompt_tokens(
+    runs: int = 10,
+    prompt_cache: Optional[PromptCache] = None,
+    message_count: int = 50
+) -> Dict[str, Any]:
+    """グラフを実行し、ノードごとの入力トークン数を集計する
+
+    Args:
+        runs: 実行回数
+        prompt_cache: システムプロンプトのキャッシュ
+        message_count: 1回の実行あたりのメッセージ数
+
+    Returns:
+        Dict[str, Any]: ノードごとの集計（課金対象の入力トークン数を含む）
+    """
+    graph = JournalAnalysisGraph(
+        llm=FakeChatModel(latency_seconds=0),
+        tools=[],
+        prompt_cache=prompt_cache
+    )
+    for run_id in range(runs):
+        graph.invoke(messages=make_messages(run_id, message_count), coalesce=False)
+
+    usage = {}
+    for name, entry in graph.prompt_usage.usage.items():
+        usage[name] = {
+            **entry,
+            "billed_input_tokens": entry["input_tokens"] - entry["cached_input_tokens"]
+        }
+    return usage
+
+
+def main():
+    """プロンプト構築・プレフィックスキャッシュの計測のエントリーポイント"""
+    parser = argparse.ArgumentParser(description="チェーン構築時間とシステムプロンプトの課金対象トークン数の計測")
+    parser.add_argument("--iterations", type=int, default=1000, help="チェーン構築の計測回数")
+    parser.add_argument("--runs", type=int, default=10, help="グラフの実行回数")
+    parser.add_argument("--output-dir", default="outputs/loadtest", help="結果の保存先ディレクトリ")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    webhook = FakeWebhookServer(latency_seconds=0).start()
+    previous_webhook_url = os.environ.get("SLACK_WEBHOOK_URL")
+    os.environ["SLACK_WEBHOOK_URL"] = webhook.url
+    try:
+        report = {
+            "chain_setup_microseconds": measure_chain_setup(args.iterations),
+            "without_prompt_cache": measure_prompt_tokens(args.runs),
+            "with_prompt_cache": measure_prompt_tokens(args.runs, prompt_cache=LocalPromptCache()),
+        }
+    finally:
+        webhook.stop()
+        restore_environ("SLACK_WEBHOOK_URL", previous_webhook_url)
+
+    for name, microseconds in report["chain_setup_microseconds"].items():
+        print(f"[{name}] chain setup per call (before): {microseconds:.1f} us")
+    for name, usage in report["without_prompt_cache"].items():
+        cached = report["with_prompt_cache"].get(name, {})
+        print(
+            f"[{name}] billed input tokens: {usage['billed_input_tokens']} -> "
+            f"{cached.get('billed_input_tokens')} ({usage['calls']} calls)"
+        )
+    print(f"Report: {save_json(content=report, directory=args.output_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import os
+import sys
+import math
+import time
+import resource
+import threading
+from typing import Any, Dict, List, Optional
+import logging
+
+from src.journal_analysis_graph import JournalAnalysisGraph
+from src.loadtest.fake_model import FakeChatModel
+from src.loadtest.fake_webhook import FakeWebhookServer
+from src.loadtest.local_prompt_cache import LocalPromptCache
+from src.models.states import SlackMessage
+from src.utils.file_handler import save_json
+
+logger = logging.getLogger(__name__)
+
+
+def _current_rss_bytes() -> Optional[int]:
+    """現在のRSSを取得する（/procが無い環境ではNone）"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def _peak_rss_bytes() -> int:
+    """プロセス開始以降の最大RSSを取得する"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxはキロバイト、macOSはバイト単位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _open_fd_count() -> Optional[int]:
+    """開いているファイルディスクリプタの数を取得する"""
+    for fd_dir in ("/proc/self/fd", "/dev/fd"):
+        if os.path.isdir(fd_dir):
+            return len(os.listdir(fd_dir))
+    return None
+
+
+def _percentile(sorted_values: List[float], percent: float) -> Optional[float]:
+    """パーセンタイル（最近傍順位法）を求める"""
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def restore_environ(name: str, value: Optional[str]) -> None:
+    """環境変数を変更前の値に戻す（元々未設定なら削除する）"""
+    if value is None:
+        os.environ.pop(name, None)
+    else:
+        os.environ[name] = value
+
+
+def make_messages(run_id: int, count: int) -> List[SlackMessage]:
+    """負荷試験用のメッセージレコードを作成する
+
+    Args:
+        run_id: 実行ごとの番号（入力の内容を実行ごとに変えるため）
+        count: メッセージ数
+
+    Returns:
+        List[SlackMessage]: メッセージレコード
+    """
+    base_ts = 1700000000 + run_id * 86400
+    return [
+        SlackMessage(
+            channel=f"channel-{i % 3}",
+            ts=f"{base_ts + i * 120}.000000",
+            user=f"U{i % 7:04d}",
+            text=f"負荷試験 run {run_id} メッセージ {i}: デプロイ手順とモニタリングの設定について"
+        )
+        for i in range(count)
+    ]
+
+
+def run_load_test(
+    concurrency: int = 4,
+    duration_seconds: float = 60,
+    message_count: int = 200,
+    use_messages: bool = False,
+    model_latency_seconds: float = 0.5,
+    model_error_rate: float = 0.0,
+    webhook_latency_seconds: float = 0.05,
+    webhook_error_rate: float = 0.0,
+    sample_interval_seconds: float = 1.0,
+    use_prompt_cache: bool = False,
+    output_directory: str = "outputs/loadtest"
+) -> Dict[str, Any]:
+    """JournalAnalysisGraphを指定した並列数・時間で実行し続ける
+
+    Slack Webhookとチャットモデルはローカルの偽物に置き換える。
+
+    Args:
+        concurrency: 同時に実行するグラフの数
+        duration_seconds: 試験時間（秒）
+        message_count: 1回の実行あたりのメッセージ数
+        use_messages: メッセージレコードで渡す（会話単位の並列要約を使う）かどうか
+        model_latency_seconds: モデルの平均遅延（秒）
+        model_error_rate: モデルが例外を送出する確率
+        webhook_latency_seconds: Webhookの平均遅延（秒）
+        webhook_error_rate: Webhookが500エラーを返す確率
+        sample_interval_seconds: リソース使用量の記録間隔（秒）
+        use_prompt_cache: システムプロンプトのキャッシュ（ローカルの代替実装）を使うかどうか
+        output_directory: 結果の保存先ディレクトリ
+
+    Returns:
+        Dict[str, Any]: 試験結果と結果ファイルのパス
+    """
+    webhook = FakeWebhookServer(
+        latency_seconds=webhook_latency_seconds,
+        error_rate=webhook_error_rate
+    ).start()
+    previous_webhook_url = os.environ.get("SLACK_WEBHOOK_URL")
+    os.environ["SLACK_WEBHOOK_URL"] = webhook.url
+
+    llm = FakeChatModel(latency_seconds=model_latency_seconds, error_rate=model_error_rate)
+    graph = JournalAnalysisGraph(
+        llm=llm,
+        tools=[],
+        prompt_cache=LocalPromptCache() if use_prompt_cache else None
+    )
+
+    lock = threading.Lock()
+    latencies: List[float] = []
+    errors: List[str] = []
+    slack_failures = 0
+    samples: List[Dict[str, Any]] = []
+    run_counter = iter(range(sys.maxsize))
+    start = time.monotonic()
+    deadline = start + duration_seconds
+    stop_sampling = threading.Event()
+
+    def sample() -> None:
+        while True:
+            samples.append({
+                "elapsed_seconds": round(time.monotonic() - start, 3),
+                "rss_bytes": _current_rss_bytes(),
+                "open_fds": _open_fd_count(),
+                "threads": threading.active_count(),
+                "completed": len(latencies),
+                "errors": len(errors)
+            })
+            if stop_sampling.wait(sample_interval_seconds):
+                return
+
+    def worker() -> None:
+        nonlocal slack_failures
+        while time.monotonic() < deadline:
+            with lock:
+                run_id = next(run_counter)
+            messages = make_messages(run_id, message_count)
+            run_start = time.monotonic()
+            try:
+                # 同一入力の集約を無効にし、毎回グラフ全体を実行する
+                if use_messages:
+                    final_state = graph.invoke(messages=messages, coalesce=False)
+                else:
+                    final_state = graph.invoke(
+                        journal_text="\n".join(f"{m.user}: {m.text}" for m in messages),
+                        coalesce=False
+                    )
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            elapsed = time.monotonic() - run_start
+            with lock:
+                latencies.append(elapsed)
+                slack_failures += not final_state.get("slack_success")
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    workers = [threading.Thread(target=worker, name=f"loadtest-{i}") for i in range(concurrency)]
+    try:
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+    finally:
+        stop_sampling.set()
+        sampler.join()
+        webhook.stop()
+        restore_environ("SLACK_WEBHOOK_URL", previous_webhook_url)
+
+    wall_seconds = time.monotonic() - start
+    sorted_latencies = sorted(latencies)
+    rss_values = [s["rss_bytes"] for s in samples if s["rss_bytes"] is not None]
+    fd_values = [s["open_fds"] for s in samples if s["open_fds"] is not None]
+
+    report = {
+        "config": {
+            "concurrency": concurrency,
+            "duration_seconds": duration_seconds,
+            "message_count": message_count,
+            "use_messages": use_messages,
+            "model_latency_seconds": model_latency_seconds,
+            "model_error_rate": model_error_rate,
+            "webhook_latency_seconds": webhook_latency_seconds,
+            "webhook_error_rate": webhook_error_rate,
+            "use_prompt_cache": use_prompt_cache
+        },
+        "wall_seconds": wall_seconds,
+        "completed": len(latencies),
+        "errors": len(errors),
+        "slack_failures": slack_failures,
+        "webhook_requests": webhook.request_count,
+        "throughput_per_second": len(latencies) / wall_seconds if wall_seconds > 0 else 0.0,
+        "latency_seconds": {
+            "p50": _percentile(sorted_latencies, 50),
+            "p90": _percentile(sorted_latencies, 90),
+            "p99": _percentile(sorted_latencies, 99),
+            "max": sorted_latencies[-1] if sorted_latencies else None
+        },
+        "peak_rss_bytes": max([_peak_rss_bytes(), *rss_values]),
+        "peak_open_fds": max(fd_values) if fd_values else None,
+        "prompt_usage": graph.prompt_usage.usage,
+        "error_samples": errors[:10],
+        "samples": samples
+    }
+
+    report_file = save_json(content=report, directory=output_directory)
+    logger.info(
+        f"Load test finished: {report['completed']} runs, {report['errors']} errors, "
+        f"{report['throughput_per_second']:.2f} runs/s, p50={report['latency_seconds']['p50']}, "
+        f"p99={report['latency_seconds']['p99']}, peak RSS={report['peak_rss_bytes'] / 1024 / 1024:.1f} MiB, "
+        f"peak fds={report['peak_open_fds']}"
+    )
+
+    return {
+        "report": report,
+        "report_file": report_file
+    }
@@ -10,6 +10,16 @@ class DiscussionPoints(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.now, description="生成時のタイムスタンプ")
 
 
+class SlackMessage(BaseModel):
+    """Slackメッセージ1件の正規化済みレコード"""
+    channel: str = Field(..., description="チャンネル名")
+    ts: str = Field(..., description="メッセージのタイムスタンプ（Slackのts文字列）")
+    user: Optional[str] = Field(None, description="投稿者のユーザーID")
+    user_name: Optional[str] = Field(None, description="投稿者の表示名")
+    text: str = Field(..., description="メッセージ本文")
+    thread_ts: Optional[str] = Field(None, description="スレッドの親メッセージのts")
+
+
 class ResearchQueries(BaseModel):
     """リサーチクエリの構造"""
     queries: List[dict] = Field(..., description="生成されたリサーチクエリ")
@@ -32,11 +42,13 @@ class JournalAnalysisState(BaseModel):
     """ジャーナル分析の状態管理"""
     
     # Input
-    journal_text: str = Field(..., description="分析対象のSlackログ")
+    journal_ref: Optional[str] = Field(None, description="分析対象のSlackログのBlobハンドル（テキストで渡した場合）")
+    messages_ref: Optional[str] = Field(None, description="分析対象のメッセージレコードのBlobハンドル（会話単位で要約する場合）")
     
     # SummaryNode Output
-    summary: Optional[str] = Field(None, description="生成された要約")
+    summary_ref: Optional[str] = Field(None, description="生成された要約のBlobハンドル")
     summary_file: Optional[str] = Field(None, description="要約が保存されたファイルパス")
+    skipped_segments: int = Field(default=0, description="要約に失敗して含まれていない会話セグメントの数")
     
     # DiscussionPointNode Output
     discussion_points: Optional[dict] = Field(None, description="抽出されたディスカッションポイント")
@@ -49,13 +61,14 @@ class JournalAnalysisState(BaseModel):
     # Final Output
     report_file: Optional[str] = Field(None, description="最終レポートが保存されたファイルパス")
     slack_success: bool = Field(default=False, description="Slackへの送信が成功したかどうか")
+    profile_dir: Optional[str] = Field(None, description="ノードごとのプロファイル結果の保存先ディレクトリ")
 
     class Config:
         """設定クラス"""
         json_schema_extra = {
             "example": {
-                "journal_text": "Slackログのテキスト...",
-                "summary": "要約テキスト...",
+                "journal_ref": "sha256:9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+                "summary_ref": "sha256:60303ae22b998861bce3b28f33eec1be758a213c86c93c076dbe9f558c11c752",
                 "summary_file": "summaries/summary_20240209.md",
                 "discussion_points": {
                     "points": ["ポイント1", "ポイント2"],
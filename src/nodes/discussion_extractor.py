@@ -1,9 +1,9 @@
-from typing import Any, Dict
-from langchain_core.prompts import ChatPromptTemplate
+from typing import Any, Dict, Optional
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel, Field
 from src.utils.file_handler import save_json
+from src.utils.prompt_cache import PromptCache, PromptUsageTracker, build_chain
 from src.models.states import DiscussionPoints
 import logging
 
@@ -19,11 +19,18 @@ class DiscussionPointsOutput(BaseModel):
 class DiscussionExtractor:
     """要約からディスカッションポイントを抽出するノード"""
     
-    def __init__(self, llm: ChatGoogleGenerativeAI):
+    def __init__(
+        self,
+        llm: ChatGoogleGenerativeAI,
+        prompt_cache: Optional[PromptCache] = None,
+        usage_tracker: Optional[PromptUsageTracker] = None
+    ):
         """初期化
         
         Args:
             llm: Gemini-1.5-proモデル
+            prompt_cache: 指定時はシステムプロンプトをキャッシュに登録して再利用する
+            usage_tracker: 指定時はチェーンの構築時間とトークン数を集計する
         """
         self.llm = llm
         self.output_parser = JsonOutputParser(pydantic_object=DiscussionPointsOutput)
@@ -60,6 +67,17 @@ class DiscussionExtractor:
 
 上記の形式で、提供された要約からディスカッションポイントを抽出してください。
 """
+        
+        # チェーンの構築（呼び出しごとには組み立て直さない）
+        self.chain = build_chain(
+            name="extract_discussion",
+            llm=self.llm,
+            system_prompt=self.system_prompt,
+            human_template="以下の要約からディスカッションポイントを抽出してください：\n\n{summary}",
+            output_parser=self.output_parser,
+            prompt_cache=prompt_cache,
+            usage_tracker=usage_tracker
+        )
 
     def run(self, summary: str) -> Dict[str, Any]:
         """ディスカッションポイントを抽出する
@@ -70,18 +88,9 @@ class DiscussionExtractor:
         Returns:
             Dict[str, Any]: 抽出されたポイントとファイルパス
         """
-        # プロンプトの作成
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", self.system_prompt),
-            ("human", "以下の要約からディスカッションポイントを抽出してください：\n\n{summary}")
-        ])
-        
-        # チェーンの構築と実行
-        chain = prompt | self.llm | self.output_parser
-        
         try:
             # ポイントの抽出
-            result = chain.invoke({"summary": summary})
+            result = self.chain.invoke({"summary": summary})
             logger.info("Successfully extracted discussion points")
             
             # DiscussionPointsモデルの作成
@@ -1,9 +1,9 @@
-from typing import Any, Dict, List
-from langchain_core.prompts import ChatPromptTemplate
+from typing import Any, Dict, List, Optional
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel, Field
 from src.utils.file_handler import save_json
+from src.utils.prompt_cache import PromptCache, PromptUsageTracker, build_chain
 from src.models.states import ResearchQueries, DiscussionPoints
 import logging
 
@@ -30,11 +30,18 @@ class QueryGeneratorOutput(BaseModel):
 class QueryGenerator:
     """ディスカッションポイントからリサーチクエリを生成するノード"""
     
-    def __init__(self, llm: ChatGoogleGenerativeAI):
+    def __init__(
+        self,
+        llm: ChatGoogleGenerativeAI,
+        prompt_cache: Optional[PromptCache] = None,
+        usage_tracker: Optional[PromptUsageTracker] = None
+    ):
         """初期化
         
         Args:
             llm: Gemini-1.5-proモデル
+            prompt_cache: 指定時はシステムプロンプトをキャッシュに登録して再利用する
+            usage_tracker: 指定時はチェーンの構築時間とトークン数を集計する
         """
         self.llm = llm
         self.output_parser = JsonOutputParser(pydantic_object=QueryGeneratorOutput)
@@ -73,20 +80,13 @@ class QueryGenerator:
 
 上記の形式で、提供されたディスカッションポイントからリサーチクエリを生成してください。
 """
-
-    def run(self, discussion_points: Dict[str, Any]) -> Dict[str, Any]:
-        """リサーチクエリを生成する
         
-        Args:
-            discussion_points: 抽出されたディスカッションポイント
-            
-        Returns:
-            Dict[str, Any]: 生成されたクエリとファイルパス
-        """
-        # プロンプトの作成
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", self.system_prompt),
-            ("human", """以下のディスカッションポイントから、リサーチクエリを生成してください。
+        # チェーンの構築（呼び出しごとには組み立て直さない）
+        self.chain = build_chain(
+            name="generate_query",
+            llm=self.llm,
+            system_prompt=self.system_prompt,
+            human_template="""以下のディスカッションポイントから、リサーチクエリを生成してください。
 必ず以下のJSON形式で出力してください：
 
 {{
@@ -102,15 +102,24 @@ class QueryGenerator:
 {points}
 
 【コンテキスト】
-{context}""")
-        ])
-        
-        # チェーンの構築と実行
-        chain = prompt | self.llm | self.output_parser
+{context}""",
+            output_parser=self.output_parser,
+            prompt_cache=prompt_cache,
+            usage_tracker=usage_tracker
+        )
+
+    def run(self, discussion_points: Dict[str, Any]) -> Dict[str, Any]:
+        """リサーチクエリを生成する
         
+        Args:
+            discussion_points: 抽出されたディスカッションポイント
+            
+        Returns:
+            Dict[str, Any]: 生成されたクエリとファイルパス
+        """
         try:
             # クエリの生成
-            result = chain.invoke({
+            result = self.chain.invoke({
                 "points": "\n".join(f"- {p}" for p in discussion_points["points"]),
                 "context": discussion_points["context"]
             })
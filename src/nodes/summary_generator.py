@@ -1,23 +1,70 @@
-from typing import Any, Dict
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from typing import Any, Dict, List, Optional
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 from langchain_google_genai import ChatGoogleGenerativeAI
+from pydantic import BaseModel, Field
 from src.utils.file_handler import save_markdown
+from src.utils.prompt_cache import PromptCache, PromptUsageTracker, build_chain
+from src.utils.slack_export import format_messages
+from src.models.states import SlackMessage
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class SegmentSummaryOutput(BaseModel):
+    """セグメント要約の出力形式"""
+    main_discussions: List[str] = Field(..., description="主要な議論（Markdownの箇条書き項目）")
+    technical_considerations: List[str] = Field(..., description="技術的な検討事項（Markdownの箇条書き項目）")
+
+
 class SummaryGenerator:
     """Slackログを要約するノード"""
     
-    def __init__(self, llm: ChatGoogleGenerativeAI):
+    def __init__(
+        self,
+        llm: ChatGoogleGenerativeAI,
+        max_concurrency: int = 4,
+        segment_max_attempts: int = 3,
+        prompt_cache: Optional[PromptCache] = None,
+        usage_tracker: Optional[PromptUsageTracker] = None
+    ):
         """初期化
         
         Args:
             llm: Gemini-1.5-proモデル
+            max_concurrency: セグメント要約の同時実行数
+            segment_max_attempts: セグメント要約1件あたりの最大試行回数
+            prompt_cache: 指定時はシステムプロンプトをキャッシュに登録して再利用する
+            usage_tracker: 指定時はチェーンの構築時間とトークン数を集計する
         """
         self.llm = llm
+        self.max_concurrency = max_concurrency
+        self.segment_output_parser = JsonOutputParser(pydantic_object=SegmentSummaryOutput)
+        self.segment_system_prompt = """
+あなたは、Slackのログを分析し、重要なディスカッションポイントを中心に要約するエキスパートです。
+提供されるのは、ひとつの会話（スレッドや連続したやり取り）のログです。
+この会話を以下の2つの観点で簡潔に要約してください：
+
+【要約の方針】
+1. main_discussions: 主要な議論
+   - 議論のトピック、意見の対立点、未解決の点
+   - 新しい発見や気づき、将来の展望
+2. technical_considerations: 技術的な検討事項
+   - 技術的な課題、提案された解決策、検討が必要な点
+   - 該当するものが無い場合は空のリスト
+
+各項目はMarkdownの箇条書き1項目分のテキストとし、必要に応じて「  - 」で始まる行で補足を加えてください。
+
+【出力例】
+{{
+    "main_discussions": [
+        "トピックA\n  - 賛成意見：...\n  - 反対意見：..."
+    ],
+    "technical_considerations": [
+        "課題1\n  - 現状：...\n  - 提案された解決策：..."
+    ]
+}}
+"""
         self.system_prompt = """
 あなたは、Slackのログを分析し、重要なディスカッションポイントを中心に要約するエキスパートです。
 以下の点に注意して、約1000文字の要約を生成してください：
@@ -63,6 +110,26 @@ class SummaryGenerator:
 
 上記の形式を参考に、提供されたSlackログを要約してください。
 """
+        
+        # チェーンの構築（呼び出しごとには組み立て直さない）
+        self.chain = build_chain(
+            name="generate_summary",
+            llm=self.llm,
+            system_prompt=self.system_prompt,
+            human_template="以下のSlackログを要約してください：\n\n{text}",
+            output_parser=StrOutputParser(),
+            prompt_cache=prompt_cache,
+            usage_tracker=usage_tracker
+        )
+        self.segment_chain = build_chain(
+            name="generate_segment_summary",
+            llm=self.llm,
+            system_prompt=self.segment_system_prompt,
+            human_template="以下の会話ログを要約してください：\n\n{text}",
+            output_parser=self.segment_output_parser,
+            prompt_cache=prompt_cache,
+            usage_tracker=usage_tracker
+        ).with_retry(stop_after_attempt=segment_max_attempts)
 
     def run(self, journal_text: str) -> Dict[str, Any]:
         """要約を生成する
@@ -73,18 +140,9 @@ class SummaryGenerator:
         Returns:
             Dict[str, Any]: 生成された要約とファイルパス
         """
-        # プロンプトの作成
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", self.system_prompt),
-            ("human", "以下のSlackログを要約してください：\n\n{text}")
-        ])
-        
-        # チェーンの構築と実行
-        chain = prompt | self.llm | StrOutputParser()
-        
         try:
             # 要約の生成
-            summary = chain.invoke({"text": journal_text})
+            summary = self.chain.invoke({"text": journal_text})
             logger.info("Successfully generated summary")
             
             # 要約の保存
@@ -100,4 +158,58 @@ class SummaryGenerator:
             
         except Exception as e:
             logger.error(f"Failed to generate summary: {str(e)}")
-            raise 
\ No newline at end of file
+            raise 
+
+    def run_segments(self, segments: List[List[SlackMessage]]) -> Dict[str, Any]:
+        """会話セグメントごとに並列で要約を生成し、ひとつの要約にまとめる
+        
+        Args:
+            segments: 会話単位に分割されたメッセージ
+            
+        Returns:
+            Dict[str, Any]: 生成された要約とファイルパス、要約に失敗したセグメント数
+        """
+        try:
+            # セグメントごとの要約を並列に生成（一部のセグメントが失敗しても他の結果は使う）
+            outputs = self.segment_chain.batch(
+                [{"text": format_messages(segment)} for segment in segments],
+                config={"max_concurrency": self.max_concurrency},
+                return_exceptions=True
+            )
+            results = []
+            skipped_segments = 0
+            for i, output in enumerate(outputs):
+                if isinstance(output, Exception):
+                    logger.warning(f"Skipped segment {i} ({len(segments[i])} messages): {str(output)}")
+                    skipped_segments += 1
+                else:
+                    results.append(output)
+            if segments and not results:
+                raise RuntimeError(f"All {len(segments)} segment summaries failed")
+            logger.info(f"Successfully generated summaries for {len(results)}/{len(segments)} segments")
+            
+            # 各セグメントの要約を既存のセクション構成にまとめる
+            content = ["# 週間ディスカッション要約", "", "## 主要な議論"]
+            content += [f"- {item}" for r in results for item in r.get("main_discussions", [])]
+            content += ["", "## 技術的な検討事項"]
+            content += [f"- {item}" for r in results for item in r.get("technical_considerations", [])]
+            if skipped_segments:
+                # 一部の会話が欠けていることを要約とレポートの読み手にも分かるようにする
+                content += ["", f"※ {len(segments)}件中{skipped_segments}件の会話は要約に失敗したため、この要約に含まれていません"]
+            summary = "\n".join(content)
+            
+            # 要約の保存
+            summary_file = save_markdown(
+                content=summary,
+                directory="outputs/summaries"
+            )
+            
+            return {
+                "summary": summary,
+                "summary_file": summary_file,
+                "skipped_segments": skipped_segments
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to generate segment summaries: {str(e)}")
+            raise
@@ -0,0 +1,124 @@
+import re
+from typing import Any, Dict, List, Set
+from src.models.states import SlackMessage
+import logging
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"[a-z0-9_]{2,}")
+CJK_PATTERN = re.compile("[\u3040-\u30ff\u3400-\u9fff]+")
+
+
+def _tokenize(text: str) -> Set[str]:
+    """類似度計算用のトークン集合を作成する
+
+    英数字は単語単位、日本語は文字bigram単位で扱う。
+
+    Args:
+        text: メッセージ本文
+
+    Returns:
+        Set[str]: トークン集合
+    """
+    text = text.lower()
+    tokens = set(WORD_PATTERN.findall(text))
+    for run in CJK_PATTERN.findall(text):
+        tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    """Jaccard係数を計算する"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class TopicSegmenter:
+    """メッセージを会話単位のセグメントに分割するノード"""
+
+    def __init__(
+        self,
+        max_gap_seconds: float = 1800,
+        min_gap_seconds: float = 300,
+        similarity_threshold: float = 0.05,
+        min_tokens: int = 4,
+        window_size: int = 10,
+        max_messages: int = 200
+    ):
+        """初期化
+
+        Args:
+            max_gap_seconds: この時間以上間隔が空いたら常に新しいセグメントにする
+            min_gap_seconds: この時間以上間隔が空き、かつ語彙の類似度が低ければ新しいセグメントにする
+            similarity_threshold: 直近のメッセージとの類似度がこれ未満なら話題が変わったとみなす
+            min_tokens: 類似度判定に使う最小トークン数（短い相槌などで分割しないため）
+            window_size: 類似度の比較対象とする直近のメッセージ数
+            max_messages: 1セグメントあたりの最大メッセージ数
+        """
+        self.max_gap_seconds = max_gap_seconds
+        self.min_gap_seconds = min_gap_seconds
+        self.similarity_threshold = similarity_threshold
+        self.min_tokens = min_tokens
+        self.window_size = window_size
+        self.max_messages = max_messages
+
+    def _is_boundary(self, gap: float, tokens: Set[str], window: List[Set[str]], size: int) -> bool:
+        """新しいセグメントを開始するかどうかを判定する"""
+        if size >= self.max_messages or gap >= self.max_gap_seconds:
+            return True
+        if gap < self.min_gap_seconds or len(tokens) < self.min_tokens:
+            return False
+        return _jaccard(tokens, set().union(*window)) < self.similarity_threshold
+
+    def run(self, messages: List[SlackMessage]) -> Dict[str, Any]:
+        """メッセージをセグメントに分割する
+
+        スレッドの返信は親メッセージと同じセグメントに入れ、
+        スレッド外のメッセージはチャンネルごとに時間間隔と語彙の類似度で区切る。
+        どのセグメントもmax_messages件を超えない（長いスレッドは複数のセグメントに分ける）。
+
+        Args:
+            messages: メッセージレコード
+
+        Returns:
+            Dict[str, Any]: セグメント（メッセージのリストのリスト）
+        """
+        roots: Dict[str, List[SlackMessage]] = {}
+        replies: Dict[str, List[SlackMessage]] = {}
+        for m in sorted(messages, key=lambda m: float(m.ts)):
+            if m.thread_ts and m.thread_ts != m.ts:
+                replies.setdefault(f"{m.channel}:{m.thread_ts}", []).append(m)
+            else:
+                roots.setdefault(m.channel, []).append(m)
+
+        segments: List[List[SlackMessage]] = []
+        for channel_messages in roots.values():
+            current: List[SlackMessage] = []
+            window: List[Set[str]] = []
+            last_ts = None
+            for m in channel_messages:
+                tokens = _tokenize(m.text)
+                gap = float(m.ts) - last_ts if last_ts is not None else 0.0
+                if current and self._is_boundary(gap, tokens, window, len(current)):
+                    segments.append(current)
+                    current, window = [], []
+                # 返信の多いスレッドもmax_messages件ごとに区切り、1回のプロンプトを大きくしない
+                for item in [m, *replies.pop(f"{m.channel}:{m.ts}", [])]:
+                    if len(current) >= self.max_messages:
+                        segments.append(current)
+                        current = []
+                    current.append(item)
+                window = (window + [tokens])[-self.window_size:]
+                last_ts = float(m.ts)
+            if current:
+                segments.append(current)
+
+        # 親メッセージが期間外にあるスレッドは単独のセグメントにする（max_messages件ごとに区切る）
+        for thread in replies.values():
+            segments.extend(
+                thread[i:i + self.max_messages] for i in range(0, len(thread), self.max_messages)
+            )
+
+        logger.info(f"Segmented {len(messages)} messages into {len(segments)} segments")
+        return {"segments": segments}
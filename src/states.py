@@ -5,11 +5,15 @@ from pydantic import Field
 
 class JournalAnalysisState(TypedDict):
     """ジャーナル分析の状態を表すクラス"""
-    journal_text: str
-    summary: NotRequired[Optional[str]]
+    journal_ref: NotRequired[Optional[str]]
+    messages_ref: NotRequired[Optional[str]]
+    summary_ref: NotRequired[Optional[str]]
     summary_file: NotRequired[Optional[str]]
+    skipped_segments: NotRequired[int]
     discussion_points: NotRequired[Optional[dict]]
     discussion_points_file: NotRequired[Optional[str]]
     research_queries: NotRequired[Optional[dict]]
     queries_file: NotRequired[Optional[str]]
-    report_file: NotRequired[Optional[str]] 
\ No newline at end of file
+    report_file: NotRequired[Optional[str]]
+    slack_success: NotRequired[bool]
+    profile_dir: NotRequired[Optional[str]] 
\ No newline at end of file
@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any
+import logging
+
+from src.utils.file_handler import ensure_directory
+
+logger = logging.getLogger(__name__)
+
+HANDLE_PREFIX = "sha256:"
+
+
+class BlobStore:
+    """内容のハッシュをキーにしたローカルのBlobストア
+
+    グラフの状態には本文の代わりにハンドル（"sha256:<hex>"）だけを持たせ、
+    本文は必要なノードでのみ読み込む。
+    読み込んだ内容は小さいもの（要約など）だけを合計サイズの上限までメモリに保持し、
+    ログ本文やメッセージレコードのような大きなBlobは保持しない。
+    """
+
+    def __init__(
+        self,
+        directory: str = "outputs/blobs",
+        cache_bytes: int = 4 * 1024 * 1024,
+        max_cached_blob_bytes: int = 256 * 1024,
+        max_age_seconds: float = 7 * 24 * 60 * 60,
+        prune_interval_seconds: float = 60 * 60
+    ):
+        """初期化
+
+        Args:
+            directory: Blobの保存先ディレクトリ
+            cache_bytes: 読み込んだBlobをメモリに保持する合計サイズの上限
+            max_cached_blob_bytes: これより大きいBlobはメモリに保持しない
+            max_age_seconds: 最後に書き込まれてからこの時間が経過したBlobは削除対象にする
+            prune_interval_seconds: prune()が実際にディレクトリを走査する最短間隔
+        """
+        self.directory = directory
+        self.max_age_seconds = max_age_seconds
+        self.prune_interval_seconds = prune_interval_seconds
+        self._prune_lock = threading.Lock()
+        self._last_pruned_at = 0.0
+        self.cache_bytes = cache_bytes
+        self.max_cached_blob_bytes = max_cached_blob_bytes
+        self._cache_lock = threading.Lock()
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cached_size = 0
+
+    def _path(self, digest: str) -> str:
+        """ハッシュ値から保存先のパスを求める"""
+        return os.path.join(self.directory, digest[:2], digest[2:])
+
+    def put_bytes(self, data: bytes) -> str:
+        """バイト列を保存する
+
+        同じ内容は一度だけ書き込まれる。
+
+        Args:
+            data: 保存する内容
+
+        Returns:
+            str: Blobのハンドル
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        try:
+            # 再利用されたBlobは削除対象にならないよう更新日時を新しくする
+            os.utime(path)
+        except FileNotFoundError:
+            ensure_directory(os.path.dirname(path))
+            # 並行実行時に書きかけのファイルが読まれないよう、一時ファイルから置き換える
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            logger.info(f"Stored blob: {HANDLE_PREFIX}{digest} ({len(data)} bytes)")
+        return f"{HANDLE_PREFIX}{digest}"
+
+    def _read(self, handle: str) -> bytes:
+        """ハンドルが指すBlobをファイルから読み込む"""
+        if not handle.startswith(HANDLE_PREFIX):
+            raise ValueError(f"Invalid blob handle: {handle}")
+        with open(self._path(handle[len(HANDLE_PREFIX):]), "rb") as f:
+            return f.read()
+
+    def get_bytes(self, handle: str) -> bytes:
+        """バイト列を読み込む
+
+        Args:
+            handle: Blobのハンドル
+
+        Returns:
+            bytes: 保存された内容
+        """
+        with self._cache_lock:
+            data = self._cache.get(handle)
+            if data is not None:
+                self._cache.move_to_end(handle)
+                return data
+
+        data = self._read(handle)
+        if len(data) <= min(self.max_cached_blob_bytes, self.cache_bytes):
+            with self._cache_lock:
+                if handle not in self._cache:
+                    self._cache[handle] = data
+                    self._cached_size += len(data)
+                    # 合計サイズの上限を超えた分は古いものから捨てる
+                    while self._cached_size > self.cache_bytes:
+                        _, evicted = self._cache.popitem(last=False)
+                        self._cached_size -= len(evicted)
+        return data
+
+    def put_text(self, text: str) -> str:
+        """テキストを保存する"""
+        return self.put_bytes(text.encode("utf-8"))
+
+    def get_text(self, handle: str) -> str:
+        """テキストを読み込む"""
+        return self.get_bytes(handle).decode("utf-8")
+
+    def put_json(self, content: Any) -> str:
+        """JSONとして保存する"""
+        return self.put_bytes(json.dumps(content, ensure_ascii=False, default=str).encode("utf-8"))
+
+    def get_json(self, handle: str) -> Any:
+        """JSONとして読み込む"""
+        return json.loads(self.get_bytes(handle))
+
+    def prune(self, force: bool = False) -> int:
+        """古いBlobを削除する
+
+        前回の走査からprune_interval_seconds以内の呼び出しは何もしない。
+
+        Args:
+            force: 間隔に関わらず走査するかどうか
+
+        Returns:
+            int: 削除したBlobの数
+        """
+        now = time.time()
+        with self._prune_lock:
+            if not force and now - self._last_pruned_at < self.prune_interval_seconds:
+                return 0
+            self._last_pruned_at = now
+
+        removed = 0
+        if not os.path.isdir(self.directory):
+            return removed
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir():
+                continue
+            for blob in os.scandir(entry.path):
+                try:
+                    if now - blob.stat().st_mtime >= self.max_age_seconds:
+                        os.remove(blob.path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        if removed:
+            logger.info(f"Pruned {removed} blobs older than {self.max_age_seconds:.0f}s from {self.directory}")
+        return removed
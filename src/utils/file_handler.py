@@ -1,5 +1,6 @@
 import os
 import json
+import uuid
 from datetime import datetime
 from typing import Any, Dict
 import logging
@@ -13,10 +14,25 @@ def ensure_directory(directory: str) -> None:
         directory: 作成するディレクトリのパス
     """
     if not os.path.exists(directory):
-        os.makedirs(directory)
+        os.makedirs(directory, exist_ok=True)
         logger.info(f"Created directory: {directory}")
 
 
+def unique_filename(directory: str, prefix: str, extension: str) -> str:
+    """同時実行でも衝突しないファイル名を作成する
+    
+    Args:
+        directory: 保存先ディレクトリ
+        prefix: ファイル名の接頭辞
+        extension: 拡張子
+        
+    Returns:
+        str: ファイルのパス
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"{directory}/{prefix}_{timestamp}_{uuid.uuid4().hex[:8]}.{extension}"
+
+
 def save_markdown(content: str, directory: str = "outputs/summaries") -> str:
     """Markdownファイルとして保存
     
@@ -28,8 +44,7 @@ def save_markdown(content: str, directory: str = "outputs/summaries") -> str:
         str: 保存されたファイルのパス
     """
     ensure_directory(directory)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{directory}/content_{timestamp}.md"
+    filename = unique_filename(directory, "content", "md")
     
     with open(filename, "w", encoding="utf-8") as f:
         f.write(content)
@@ -49,8 +64,7 @@ def save_json(content: Dict[str, Any], directory: str = "outputs/json") -> str:
         str: 保存されたファイルのパス
     """
     ensure_directory(directory)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{directory}/content_{timestamp}.json"
+    filename = unique_filename(directory, "content", "json")
     
     with open(filename, "w", encoding="utf-8") as f:
         json.dump(content, f, ensure_ascii=False, indent=2, default=str)
@@ -77,8 +91,7 @@ def save_final_report(
         str: 保存されたファイルのパス
     """
     ensure_directory(directory)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{directory}/report_{timestamp}.md"
+    filename = unique_filename(directory, "report", "md")
     
     content = [
         "# Journal Analysis Report",
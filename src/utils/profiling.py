@@ -0,0 +1,293 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Dict, List
+import logging
+
+from src.utils.file_handler import ensure_directory
+
+logger = logging.getLogger(__name__)
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 待機中のスレッドの最内フレーム（ファイル名, 関数名）。CPUを使っていないため記録しない
+IDLE_FRAMES = frozenset({
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+})
+
+
+def _frame_label(code: Any) -> str:
+    """スタックフレームの表示名を作成する（パスはプロジェクト・パッケージからの相対パスに短縮）"""
+    filename = code.co_filename
+    if "site-packages" + os.sep in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    elif filename.startswith(PROJECT_ROOT + os.sep):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+class _StackSampler:
+    """一定間隔で全スレッドのスタックを記録するサンプラー
+
+    チェーンのbatchなどワーカースレッドで実行される処理も含めるため、
+    サンプラー自身を除く全スレッドを対象にする（待機中のスレッドは除く）。
+    そのため同時に実行されている他の処理のスタックも含まれる。
+    """
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.stacks: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="node-profiler", daemon=True)
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval_seconds):
+            thread_names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+# tracemallocはプロセス全体で1つのため、同時に実行される複数のプロファイルで参照数を共有する
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_started = False
+# ノードの同時実行を検出するためのカウンタ（_tracemalloc_lockで保護）
+_active_nodes = 0
+_node_starts = 0
+
+
+def _acquire_tracemalloc() -> None:
+    """tracemallocの利用を開始する（最初の利用者がトレースを開始する）"""
+    global _tracemalloc_users, _tracemalloc_started
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_started = True
+        _tracemalloc_users += 1
+
+
+def _release_tracemalloc() -> None:
+    """tracemallocの利用を終了する（最後の利用者が自分で開始したトレースを停止する）"""
+    global _tracemalloc_users, _tracemalloc_started
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_started:
+            tracemalloc.stop()
+            _tracemalloc_started = False
+
+
+class NodeProfiler:
+    """グラフのノードごとにCPUサンプリングとメモリ割り当てを記録するプロファイラー
+
+    ノードごとに以下を実行ディレクトリへ出力する。
+    - <ノード名>.collapsed: collapsed stack形式のスタック（flamegraph.plやspeedscopeで可視化）
+    - profile.json: 実行時間、CPU時間、ピークメモリの増分、割り当ての多い箇所
+
+    tracemallocはstart()からstop()の間だけ有効にする（with文でも使える）。
+    CPU時間・スタックのサンプル・メモリの計測値はいずれもプロセス全体の値のため、
+    プロファイル付きの実行が並行したノードでは他の実行の分も含まれる。
+    そのノードはprofile.jsonで"overlapped": trueになり、cpu_seconds・.collapsedファイル・
+    ピークメモリの増分は目安として扱う。
+    プロファイルの記録で発生したエラーは警告のみとし、ノードの実行は失敗させない。
+    """
+
+    def __init__(
+        self,
+        directory: str = "outputs/profiles",
+        sample_interval_seconds: float = 0.005,
+        top_allocations: int = 20
+    ):
+        """初期化
+
+        Args:
+            directory: 実行ディレクトリを作成する親ディレクトリ
+            sample_interval_seconds: スタックのサンプリング間隔（秒）
+            top_allocations: 記録する割り当て箇所の数
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.run_directory = f"{directory}/run_{timestamp}_{uuid.uuid4().hex[:8]}"
+        self.sample_interval_seconds = sample_interval_seconds
+        self.top_allocations = top_allocations
+        self.nodes: List[Dict[str, Any]] = []
+        self._stacks: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self) -> None:
+        """メモリ割り当ての記録を開始する"""
+        if not self._started:
+            _acquire_tracemalloc()
+            self._started = True
+
+    def stop(self) -> None:
+        """メモリ割り当ての記録を終了する"""
+        if self._started:
+            self._started = False
+            _release_tracemalloc()
+
+    def __enter__(self) -> "NodeProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _begin(self) -> Dict[str, Any]:
+        """ノード実行前の計測を開始する"""
+        global _active_nodes, _node_starts
+        with _tracemalloc_lock:
+            _active_nodes += 1
+            _node_starts += 1
+            probe: Dict[str, Any] = {"start_seq": _node_starts, "overlapped": _active_nodes > 1}
+            # 他のノードが実行中ならピークはリセットしない（そのノードの計測を壊さないため）
+            if not probe["overlapped"]:
+                tracemalloc.reset_peak()
+            probe["memory_before"], _ = tracemalloc.get_traced_memory()
+        try:
+            probe["snapshot_before"] = tracemalloc.take_snapshot()
+            probe["sampler"] = _StackSampler(self.sample_interval_seconds)
+            probe["sampler"].start()
+        except Exception:
+            self._end_active()
+            raise
+        probe["wall_start"] = time.perf_counter()
+        probe["cpu_start"] = time.process_time()
+        return probe
+
+    def _end_active(self) -> int:
+        """実行中のノード数を減らし、これまでに開始されたノードの通し番号を返す"""
+        global _active_nodes
+        with _tracemalloc_lock:
+            _active_nodes -= 1
+            return _node_starts
+
+    def _finish(self, name: str, probe: Dict[str, Any]) -> None:
+        """ノード実行後の計測を終了して記録する"""
+        wall_seconds = time.perf_counter() - probe["wall_start"]
+        cpu_seconds = time.process_time() - probe["cpu_start"]
+        sampler = probe["sampler"]
+        try:
+            sampler.stop()
+            memory_after, memory_peak = tracemalloc.get_traced_memory()
+            snapshot_after = tracemalloc.take_snapshot()
+        finally:
+            last_start_seq = self._end_active()
+        overlapped = probe["overlapped"] or last_start_seq != probe["start_seq"]
+
+        memory_before = probe["memory_before"]
+        snapshot_filter = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]
+        top_stats = snapshot_after.filter_traces(snapshot_filter).compare_to(
+            probe["snapshot_before"].filter_traces(snapshot_filter), "lineno"
+        )[:self.top_allocations]
+
+        with self._lock:
+            self._stacks[name] = self._stacks.get(name, Counter()) + sampler.stacks
+            self.nodes.append({
+                "node": name,
+                "wall_seconds": wall_seconds,
+                "cpu_seconds": cpu_seconds,
+                "samples": sampler.sample_count,
+                "overlapped": overlapped,
+                "memory_delta_bytes": memory_after - memory_before,
+                "peak_memory_delta_bytes": memory_peak - memory_before,
+                "top_allocations": [
+                    {
+                        "location": str(stat.traceback[0]),
+                        "size_delta_bytes": stat.size_diff,
+                        "count_delta": stat.count_diff,
+                    }
+                    for stat in top_stats
+                ],
+            })
+        logger.info(
+            f"Profiled node {name}: {wall_seconds:.3f}s wall, {cpu_seconds:.3f}s CPU, "
+            f"peak memory +{(memory_peak - memory_before) / 1024 / 1024:.1f} MiB"
+            + (" (overlapped with other profiled nodes; CPU, stacks and memory include them)" if overlapped else "")
+        )
+
+    def wrap(self, name: str, fn: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+        """ノードの関数をプロファイル付きの関数で包む
+
+        start()を呼んでいない（tracemallocが無効な）間はプロファイルせずにそのまま実行する。
+
+        Args:
+            name: ノード名
+            fn: ノードの関数
+
+        Returns:
+            Callable: プロファイル付きのノード関数
+        """
+        @wraps(fn)
+        def profiled(state: Dict[str, Any]) -> Dict[str, Any]:
+            probe = None
+            if tracemalloc.is_tracing():
+                try:
+                    probe = self._begin()
+                except Exception as e:
+                    logger.warning(f"Failed to start profiling node {name}: {str(e)}")
+            if probe is None:
+                return fn(state)
+
+            try:
+                return fn(state)
+            finally:
+                try:
+                    self._finish(name, probe)
+                except Exception as e:
+                    logger.warning(f"Failed to record profile of node {name}: {str(e)}")
+
+        return profiled
+
+    def save(self) -> str:
+        """プロファイル結果を実行ディレクトリに保存する
+
+        Returns:
+            str: 実行ディレクトリのパス
+        """
+        ensure_directory(self.run_directory)
+        with self._lock:
+            for name, stacks in self._stacks.items():
+                with open(f"{self.run_directory}/{name}.collapsed", "w", encoding="utf-8") as f:
+                    f.writelines(f"{stack} {count}\n" for stack, count in stacks.most_common())
+            with open(f"{self.run_directory}/profile.json", "w", encoding="utf-8") as f:
+                json.dump({"nodes": self.nodes}, f, ensure_ascii=False, indent=2)
+
+        logger.info(f"Saved node profiles: {self.run_directory}")
+        return self.run_directory
@@ -0,0 +1,314 @@
+import math
+import time
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+import logging
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.outputs import LLMResult
+from langchain_core.prompts import ChatPromptTemplate, SystemMessagePromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda
+
+logger = logging.getLogger(__name__)
+
+
+def render_system_prompt(system_prompt: str) -> str:
+    """テンプレート用にエスケープされたシステムプロンプト（{{ }}）を実際の文字列にする"""
+    return SystemMessagePromptTemplate.from_template(system_prompt).format().content
+
+
+class PromptTooShortError(ValueError):
+    """プロンプトがキャッシュできる最小トークン数に満たないことを表す例外"""
+
+
+class PromptCache(ABC):
+    """固定のシステムプロンプトを一度だけ登録し、呼び出し間で再利用するキャッシュ
+
+    登録済みのプロンプトを参照するハンドルをモデル呼び出しの`cached_content`に渡す。
+    ハンドルは呼び出しのたびに取得し、有効期限が近づいたものは延長（または再登録）する。
+    登録・延長の通信はロックの外で行い、その間の他の呼び出しは待たずに
+    期限内のハンドル（無ければ通常の送信）を使う。
+    """
+
+    def __init__(self, refresh_margin_seconds: float = 300, retry_seconds: float = 600):
+        """初期化
+
+        Args:
+            refresh_margin_seconds: 有効期限のこの秒数前になったらハンドルを延長する
+            retry_seconds: 登録に失敗したプロンプトを再登録するまでの秒数
+        """
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        # キー -> (ハンドル, 有効期限のUNIX時刻)。登録に失敗した場合のハンドルはNone
+        self._handles: Dict[str, Tuple[Optional[str], float]] = {}
+        # 登録・延長の通信中のキー
+        self._in_flight: Set[str] = set()
+
+    @abstractmethod
+    def _create(self, llm: BaseChatModel, system_prompt: str) -> Tuple[str, float]:
+        """プロンプトを登録してハンドルを返す
+
+        Args:
+            llm: 呼び出しに使うモデル
+            system_prompt: 登録するシステムプロンプト
+
+        Returns:
+            Tuple[str, float]: キャッシュのハンドルと有効期限のUNIX時刻
+
+        Raises:
+            PromptTooShortError: 最小トークン数に満たず、登録しても失敗することが分かっている場合
+        """
+
+    def _refresh(self, llm: BaseChatModel, system_prompt: str, handle: str) -> Tuple[str, float]:
+        """有効期限が近いハンドルを延長する（既定では登録し直す）
+
+        Args:
+            llm: 呼び出しに使うモデル
+            system_prompt: 登録済みのシステムプロンプト
+            handle: 現在のハンドル
+
+        Returns:
+            Tuple[str, float]: キャッシュのハンドルと新しい有効期限のUNIX時刻
+        """
+        return self._create(llm, system_prompt)
+
+    def register(self, llm: BaseChatModel, system_prompt: str) -> Optional[str]:
+        """有効なハンドルを返す（未登録なら登録し、期限が近ければ延長する）
+
+        Args:
+            llm: 呼び出しに使うモデル
+            system_prompt: 登録するシステムプロンプト
+
+        Returns:
+            Optional[str]: キャッシュのハンドル（登録に失敗した場合はNone）
+        """
+        key = hashlib.sha256(f"{type(llm).__name__}\0{system_prompt}".encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._lock:
+            handle, expires_at = self._handles.get(key, (None, 0.0))
+            margin = self.refresh_margin_seconds if handle is not None else 0.0
+            if now < expires_at - margin:
+                return handle
+            if key in self._in_flight:
+                # 他の呼び出しが登録・延長中なら待たずに、期限内のハンドルか通常の送信を使う
+                return handle if now < expires_at else None
+            self._in_flight.add(key)
+
+        try:
+            handle, expires_at = self._register_remote(llm, system_prompt, handle, now)
+        finally:
+            with self._lock:
+                self._handles[key] = (handle, expires_at)
+                self._in_flight.discard(key)
+        return handle
+
+    def _register_remote(
+        self,
+        llm: BaseChatModel,
+        system_prompt: str,
+        handle: Optional[str],
+        now: float
+    ) -> Tuple[Optional[str], float]:
+        """登録または延長を行う（ロックの外で呼ぶ）"""
+        try:
+            if handle is not None:
+                try:
+                    handle, expires_at = self._refresh(llm, system_prompt, handle)
+                    logger.info(f"Extended cached prompt prefix: {handle}")
+                    return handle, expires_at
+                except Exception as e:
+                    # 期限切れなどで延長できない場合は登録し直す
+                    logger.warning(f"Failed to extend cached prompt prefix, registering again: {str(e)}")
+            handle, expires_at = self._create(llm, system_prompt)
+            logger.info(f"Registered cached prompt prefix: {handle}")
+            return handle, expires_at
+        except PromptTooShortError as e:
+            # 何度登録しても失敗するため、以降は通常の送信のみにする
+            logger.warning(f"Prompt prefix is too short to cache, sending it inline: {str(e)}")
+            return None, math.inf
+        except Exception as e:
+            # 通信の失敗などは通常の送信に戻し、retry_seconds後に再登録を試みる
+            logger.warning(f"Failed to register cached prompt prefix, sending it inline: {str(e)}")
+            return None, now + self.retry_seconds
+
+    def bind(self, llm: BaseChatModel, system_prompt: str) -> Runnable:
+        """登録済みのプロンプトを使うモデルを返す
+
+        ハンドルは呼び出し時に取得するため、期限切れのハンドルを使い続けることはない。
+        有効なハンドルが無い呼び出しでは、システムプロンプトを先頭に付けて通常どおり送信する。
+
+        Args:
+            llm: 呼び出しに使うモデル
+            system_prompt: システムプロンプト（エスケープ済みのテンプレート文字列）
+
+        Returns:
+            Runnable: システムプロンプトを含まないメッセージを受け取るモデル
+        """
+        rendered = render_system_prompt(system_prompt)
+        prefix = SystemMessage(content=rendered)
+        inline_llm = RunnableLambda(lambda prompt: [prefix, *prompt.to_messages()]) | llm
+        bound: Dict[str, Runnable] = {}
+
+        def route(prompt: Any) -> Runnable:
+            # 返したRunnableは同じ入力で呼び出される
+            handle = self.register(llm, rendered)
+            if handle is None:
+                return inline_llm
+            runnable = bound.get(handle)
+            if runnable is None:
+                runnable = self._bind_handle(llm, handle, prefix)
+                bound.clear()
+                bound[handle] = runnable
+            return runnable
+
+        # 構築時に登録しておき、登録の失敗を早めに警告する
+        self.register(llm, rendered)
+        return RunnableLambda(route)
+
+    def _bind_handle(self, llm: BaseChatModel, handle: str, prefix: SystemMessage) -> Runnable:
+        """ハンドルを渡して呼び出すモデルを返す"""
+        return llm.bind(cached_content=handle)
+
+
+class VertexPromptCache(PromptCache):
+    """Vertex AIのコンテキストキャッシュを使うキャッシュ
+
+    モデルのバージョンによってキャッシュできる最小トークン数が決まっており、
+    それより短いプロンプトは登録を試みずに通常の送信にする。
+    有効期限が近づいたキャッシュはCachedContent.updateで延長する。
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, min_tokens: int = 32768, **kwargs: Any):
+        """初期化
+
+        Args:
+            ttl_seconds: キャッシュの有効期間（秒）
+            min_tokens: キャッシュできる最小トークン数（gemini-1.5-proは32,768）
+            **kwargs: PromptCacheの引数
+        """
+        super().__init__(**kwargs)
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+
+    def _create(self, llm: BaseChatModel, system_prompt: str) -> Tuple[str, float]:
+        token_count = llm.get_num_tokens(system_prompt)
+        if token_count < self.min_tokens:
+            raise PromptTooShortError(f"{token_count} tokens is below the minimum of {self.min_tokens}")
+
+        from vertexai.preview import caching
+
+        # 有効期限はリクエスト前の時刻から数え、実際より遅く見積もらないようにする
+        requested_at = time.time()
+        cached_content = caching.CachedContent.create(
+            model_name=llm.model_name,
+            system_instruction=system_prompt,
+            ttl=timedelta(seconds=self.ttl_seconds)
+        )
+        return cached_content.name, requested_at + self.ttl_seconds
+
+    def _refresh(self, llm: BaseChatModel, system_prompt: str, handle: str) -> Tuple[str, float]:
+        from vertexai.preview import caching
+
+        requested_at = time.time()
+        caching.CachedContent(cached_content_name=handle).update(ttl=timedelta(seconds=self.ttl_seconds))
+        return handle, requested_at + self.ttl_seconds
+
+
+class PromptUsageTracker(BaseCallbackHandler):
+    """モデル呼び出しの入力トークン数（うちキャッシュ済みの分）を集計するコールバック"""
+
+    def __init__(self):
+        """初期化"""
+        self._lock = threading.Lock()
+        self._run_names: Dict[UUID, str] = {}
+        self.usage: Dict[str, Dict[str, Any]] = {}
+
+    def record_setup(self, name: str, seconds: float) -> None:
+        """チェーンの構築にかかった時間を記録する"""
+        with self._lock:
+            self._entry(name)["setup_seconds"] += seconds
+
+    def _entry(self, name: str) -> Dict[str, Any]:
+        """集計のエントリを取得する（ロック取得中に呼ぶ）"""
+        return self.usage.setdefault(name, {
+            "setup_seconds": 0.0,
+            "calls": 0,
+            "input_tokens": 0,
+            "cached_input_tokens": 0,
+        })
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[BaseMessage]],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> None:
+        with self._lock:
+            self._run_names[run_id] = (metadata or {}).get("prompt_node", "unknown")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._run_names.pop(run_id, None)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            entry = self._entry(self._run_names.pop(run_id, "unknown"))
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    entry["calls"] += 1
+                    entry["input_tokens"] += usage.get("input_tokens", 0)
+                    entry["cached_input_tokens"] += (usage.get("input_token_details") or {}).get("cache_read", 0)
+
+
+def build_chain(
+    name: str,
+    llm: BaseChatModel,
+    system_prompt: str,
+    human_template: str,
+    output_parser: Runnable,
+    prompt_cache: Optional[PromptCache] = None,
+    usage_tracker: Optional[PromptUsageTracker] = None
+) -> Runnable:
+    """ノードのチェーン（prompt | llm | parser）を構築する
+
+    ノードの初期化時に一度だけ呼び、呼び出しごとに組み立て直さない。
+
+    Args:
+        name: ノード名（集計のキー）
+        llm: 呼び出しに使うモデル
+        system_prompt: システムプロンプト（エスケープ済みのテンプレート文字列）
+        human_template: ユーザーメッセージのテンプレート
+        output_parser: 出力パーサー
+        prompt_cache: 指定時はシステムプロンプトをキャッシュに登録して再利用する
+        usage_tracker: 指定時は構築時間とトークン数を集計する
+
+    Returns:
+        Runnable: 構築したチェーン
+    """
+    start = time.perf_counter()
+
+    if prompt_cache is not None:
+        cached_llm = prompt_cache.bind(llm, system_prompt)
+        chain = ChatPromptTemplate.from_messages([("human", human_template)]) | cached_llm | output_parser
+    else:
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", system_prompt),
+            ("human", human_template)
+        ])
+        chain = prompt | llm | output_parser
+
+    if usage_tracker is not None:
+        chain = chain.with_config(callbacks=[usage_tracker], metadata={"prompt_node": name})
+        usage_tracker.record_setup(name, time.perf_counter() - start)
+    return chain
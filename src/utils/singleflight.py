@@ -0,0 +1,92 @@
+import time
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """同じキーの同時実行をひとつにまとめるクラス
+
+    実行中のキーに対する呼び出しは実行中の処理の完了を待って同じ結果を受け取り、
+    完了後もttl_secondsの間は結果をキャッシュから返す。
+    """
+
+    def __init__(self, ttl_seconds: float = 300):
+        """初期化
+
+        Args:
+            ttl_seconds: 完了した結果をキャッシュする秒数（0でキャッシュしない）
+        """
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._cache: Dict[str, Tuple[float, Any]] = {}
+
+    def _evict_expired(self, now: float) -> None:
+        """期限切れのキャッシュを削除する（ロック取得中に呼ぶ）"""
+        for key in [k for k, (expires_at, _) in self._cache.items() if expires_at <= now]:
+            del self._cache[key]
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        cacheable: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """キーに対応する処理を実行する
+
+        Args:
+            key: 入力を識別するキー
+            fn: 実行する処理
+            cacheable: 結果をキャッシュしてよいかを判定する関数（省略時は常にキャッシュする）
+
+        Returns:
+            Any: 処理結果（同時実行・キャッシュされた呼び出しとは同じオブジェクトを共有する）
+
+        Raises:
+            Exception: 処理が失敗した場合（待機中の呼び出しにも同じ例外を送出する）
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._evict_expired(now)
+            if key in self._cache:
+                logger.info(f"Serving cached result: {key}")
+                return self._cache[key][1]
+            future = self._in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not is_leader:
+            logger.info(f"Attaching to in-flight execution: {key}")
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        # 失敗・不完全な結果はキャッシュせず、次の呼び出しで再実行させる
+        try:
+            should_cache = self.ttl_seconds > 0 and (cacheable is None or cacheable(result))
+        except Exception as e:
+            logger.warning(f"Failed to check cacheability, not caching: {str(e)}")
+            should_cache = False
+
+        with self._lock:
+            del self._in_flight[key]
+            if should_cache:
+                self._cache[key] = (time.monotonic() + self.ttl_seconds, result)
+        future.set_result(result)
+        return result
+
+
+# プロセス内で共有するインスタンス
+default_singleflight = SingleFlight()
@@ -0,0 +1,287 @@
+import os
+import re
+import json
+import time
+import tempfile
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import requests
+
+from src.utils.file_handler import ensure_directory
+from src.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# <@U0123ABC>, <@U0123ABC|name>, <#C0123|name>, <!here>, <https://...|label> を1つのパターンで扱う
+# 記号の無い参照はURLスキームで始まるものに限り、"List<String>" などの本文は置き換えない
+REFERENCE_PATTERN = re.compile(r"<(?:([@#!])([^<>|]+)|((?:https?|mailto):[^<>|]+))(?:\|([^<>]*))?>")
+
+# Web APIが「存在しない」と明示的に返すエラー
+NOT_FOUND_ERRORS = frozenset({"user_not_found", "channel_not_found"})
+
+USERS = "users"
+CHANNELS = "channels"
+
+# (種別, ID) を受け取り表示名を返す関数。存在しないIDにはNoneを返し、
+# 一時的な失敗（レート制限・タイムアウトなど）では例外を送出する
+Refresher = Callable[[str, str], Optional[str]]
+
+
+class RateLimitedError(Exception):
+    """refresherがレート制限を受けたことを表す例外"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        """初期化
+
+        Args:
+            message: エラーメッセージ
+            retry_after: 再試行まで待つ秒数（Retry-Afterヘッダーの値）
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SlackDirectory:
+    """SlackのユーザーID・チャンネルIDと表示名の対応を保持するキャッシュ"""
+
+    def __init__(
+        self,
+        cache_file: str = "outputs/cache/slack_directory.json",
+        ttl_seconds: float = 7 * 24 * 60 * 60,
+        refresher: Optional[Refresher] = None,
+        miss_ttl_seconds: float = 60 * 60,
+        error_backoff_seconds: float = 30
+    ):
+        """初期化
+
+        Args:
+            cache_file: キャッシュの保存先ファイル
+            ttl_seconds: エントリの有効期間（秒）
+            refresher: キャッシュに無い・期限切れのIDを解決する関数
+            miss_ttl_seconds: 存在しないと分かったIDを再取得しない期間（秒）
+            error_backoff_seconds: 取得に失敗したIDを再取得しない期間（秒、Retry-Afterがあればその値以上）
+        """
+        self.cache_file = cache_file
+        self.ttl_seconds = ttl_seconds
+        self.refresher = refresher
+        self.miss_ttl_seconds = miss_ttl_seconds
+        self.error_backoff_seconds = error_backoff_seconds
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries: Dict[str, Dict[str, Dict[str, Any]]] = {USERS: {}, CHANNELS: {}}
+        # 存在しないと分かったIDの再取得を抑制するための記録（保存はしない）
+        self._misses: Dict[Tuple[str, str], float] = {}
+        # 取得に失敗したIDの再取得可能時刻と、レート制限中のrefresher全体の再開時刻
+        self._retry_at: Dict[Tuple[str, str], float] = {}
+        self._blocked_until = 0.0
+        # 同じIDの同時取得をひとつにまとめる
+        self._refreshes = SingleFlight(ttl_seconds=0)
+
+        if os.path.exists(cache_file):
+            with open(cache_file, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            now = time.time()
+            for kind in (USERS, CHANNELS):
+                self._entries[kind] = {
+                    key: entry for key, entry in cached.get(kind, {}).items()
+                    if now - entry["updated_at"] < ttl_seconds
+                }
+            logger.info(
+                f"Loaded Slack directory cache: {len(self._entries[USERS])} users, "
+                f"{len(self._entries[CHANNELS])} channels"
+            )
+
+    def _set(self, kind: str, key: str, name: str, now: float) -> None:
+        """エントリを登録する（ロック取得中に呼ぶ）"""
+        self._entries[kind][key] = {"name": name, "updated_at": now}
+        self._dirty = True
+
+    def load_users(self, users: List[Dict[str, Any]]) -> None:
+        """ユーザー一覧（users.jsonの形式）を登録する
+
+        Args:
+            users: ユーザー情報のリスト
+        """
+        now = time.time()
+        with self._lock:
+            for user in users:
+                profile = user.get("profile") or {}
+                name = profile.get("display_name") or profile.get("real_name") or user.get("real_name") or user.get("name")
+                if user.get("id") and name:
+                    self._set(USERS, user["id"], name, now)
+
+    def load_channels(self, channels: List[Dict[str, Any]]) -> None:
+        """チャンネル一覧（channels.jsonの形式）を登録する
+
+        Args:
+            channels: チャンネル情報のリスト
+        """
+        now = time.time()
+        with self._lock:
+            for channel in channels:
+                if channel.get("id") and channel.get("name"):
+                    self._set(CHANNELS, channel["id"], channel["name"], now)
+
+    def load_export(self, users_path: Optional[str] = None, channels_path: Optional[str] = None) -> None:
+        """エクスポートのJSONファイルから登録する
+
+        Args:
+            users_path: users.jsonのパス
+            channels_path: channels.jsonのパス
+        """
+        if users_path:
+            with open(users_path, "r", encoding="utf-8") as f:
+                self.load_users(json.load(f))
+        if channels_path:
+            with open(channels_path, "r", encoding="utf-8") as f:
+                self.load_channels(json.load(f))
+        self.save()
+
+    def lookup(self, kind: str, key: str) -> Optional[str]:
+        """IDから表示名を取得する
+
+        期限切れのエントリは削除し、refresherが設定されていれば再取得する。
+        refresherはロックの外で呼び、同じIDの同時取得はひとつにまとめる。
+        存在しないと分かったIDはmiss_ttl_secondsの間、取得に失敗したIDはerror_backoff_seconds
+        （レート制限時はRetry-Afterの秒数、その間は全IDの取得を止める）の間は再取得しない。
+
+        Args:
+            kind: "users" または "channels"
+            key: ユーザーIDまたはチャンネルID
+
+        Returns:
+            Optional[str]: 表示名（解決できない場合はNone）
+        """
+        now = time.time()
+        entry = self._entries[kind].get(key)
+        if entry is not None and now - entry["updated_at"] < self.ttl_seconds:
+            return entry["name"]
+
+        with self._lock:
+            if entry is not None:
+                self._entries[kind].pop(key, None)
+                self._dirty = True
+            missed_at = self._misses.get((kind, key))
+            if self.refresher is None or (missed_at is not None and now - missed_at < self.miss_ttl_seconds):
+                return None
+            if now < max(self._retry_at.get((kind, key), 0.0), self._blocked_until):
+                return None
+
+        try:
+            name = self._refreshes.do(f"{kind}:{key}", lambda: self.refresher(kind, key))
+        except Exception as e:
+            # 一時的な失敗は存在しないIDとは区別し、短い間だけ再取得を控える
+            retry_after = getattr(e, "retry_after", None) or 0.0
+            failed_at = time.time()
+            with self._lock:
+                self._retry_at[(kind, key)] = failed_at + max(self.error_backoff_seconds, retry_after)
+                if retry_after:
+                    self._blocked_until = max(self._blocked_until, failed_at + retry_after)
+            logger.warning(f"Failed to refresh {kind} {key}: {str(e)}")
+            return None
+
+        with self._lock:
+            self._retry_at.pop((kind, key), None)
+            if name:
+                self._set(kind, key, name, now)
+                self._misses.pop((kind, key), None)
+            else:
+                self._misses[(kind, key)] = now
+        return name
+
+    def resolve(self, text: str) -> str:
+        """メンション・チャンネル参照・リンクを短い表示名に置き換える
+
+        テキスト全体を1回の走査で置き換える。
+
+        Args:
+            text: Slackのメッセージテキスト
+
+        Returns:
+            str: 置き換え後のテキスト
+        """
+        resolved: Dict[str, str] = {}
+
+        def replace(match: re.Match) -> str:
+            token = match.group(0)
+            if token in resolved:
+                return resolved[token]
+            sigil, key, url, label = match.groups()
+            if sigil == "@":
+                name = self.lookup(USERS, key)
+                result = f"@{name or label or key}"
+            elif sigil == "#":
+                name = self.lookup(CHANNELS, key)
+                result = f"#{name or label or key}"
+            elif sigil == "!":
+                # <!here>, <!channel>, <!subteam^S0123|@team> など
+                result = label or f"@{key}"
+            else:
+                # <https://...|label> はラベルのみ、ラベルが無ければURLを残す
+                result = label or url
+            resolved[token] = result
+            return result
+
+        return REFERENCE_PATTERN.sub(replace, text)
+
+    def save(self) -> None:
+        """キャッシュをファイルに保存する（変更が無ければ何もしない）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            directory = os.path.dirname(self.cache_file) or "."
+            ensure_directory(directory)
+            fd, tmp_path = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_file)
+            self._dirty = False
+        logger.info(f"Saved Slack directory cache: {self.cache_file}")
+
+
+def make_web_api_refresher(token: str, timeout: float = 10) -> Refresher:
+    """Slack Web API（users.info / conversations.info）で表示名を取得するrefresherを作成する
+
+    Args:
+        token: Slackのボットトークン
+        timeout: リクエストのタイムアウト（秒）
+
+    Returns:
+        Refresher: refresher関数
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def call(method: str, params: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """APIを呼び出す（存在しない場合はNone、それ以外の失敗は例外）"""
+        response = requests.get(
+            f"https://slack.com/api/{method}", params=params, headers=headers, timeout=timeout
+        )
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            raise RateLimitedError(
+                f"Slack API {method} rate limited",
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        response.raise_for_status()
+        data = response.json()
+        if not data.get("ok"):
+            if data.get("error") in NOT_FOUND_ERRORS:
+                return None
+            raise RuntimeError(f"Slack API {method} failed: {data.get('error')}")
+        return data
+
+    def refresh(kind: str, key: str) -> Optional[str]:
+        if kind == USERS:
+            data = call("users.info", {"user": key})
+            if data is None:
+                return None
+            user = data.get("user") or {}
+            profile = user.get("profile") or {}
+            return profile.get("display_name") or profile.get("real_name") or user.get("name")
+        data = call("conversations.info", {"channel": key})
+        if data is None:
+            return None
+        return (data.get("channel") or {}).get("name")
+
+    return refresh
@@ -0,0 +1,267 @@
+import gc
+import os
+import re
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import logging
+
+try:
+    import orjson
+
+    def _loads(data: bytes) -> Any:
+        return orjson.loads(data)
+except ImportError:  # orjsonが無い環境では標準ライブラリで代替
+    import json
+
+    def _loads(data: bytes) -> Any:
+        return json.loads(data)
+
+from src.models.states import SlackMessage
+from src.utils.slack_directory import SlackDirectory
+
+logger = logging.getLogger(__name__)
+
+# channels/<name>/<YYYY-MM-DD>.json と <name>/<YYYY-MM-DD>.json の両方に対応
+DAY_FILE_PATTERN = re.compile(r"(?:^|/)([^/]+)/(\d{4}-\d{2}-\d{2})\.json$")
+
+# ワーカーから返すメッセージ: (channel, ts, user, user_name, text, thread_ts)
+MessageTuple = Tuple[str, str, Optional[str], Optional[str], str, Optional[str]]
+
+# 要約に不要なシステムメッセージ
+SKIPPED_SUBTYPES = frozenset({
+    "channel_join",
+    "channel_leave",
+    "channel_purpose",
+    "channel_topic",
+    "channel_name",
+    "channel_archive",
+    "channel_unarchive",
+})
+
+
+def _iter_day_batches(archive: zipfile.ZipFile, batch_bytes: int) -> Iterator[List[Tuple[str, str]]]:
+    """日別JSONファイルのエントリを、展開後のサイズが概ねbatch_bytesになるようにまとめて列挙する
+
+    Args:
+        archive: Slackエクスポートのzip
+        batch_bytes: 1バッチあたりの展開後サイズの目安
+
+    Returns:
+        Iterator[List[Tuple[str, str]]]: (エントリ名, チャンネル名) のリスト
+    """
+    batch: List[Tuple[str, str]] = []
+    size = 0
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        match = DAY_FILE_PATTERN.search(info.filename)
+        if not match:
+            continue
+        batch.append((info.filename, match.group(1)))
+        size += info.file_size
+        if size >= batch_bytes:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+# ワーカープロセスごとに開いたままにするzip
+_worker_archive: Optional[zipfile.ZipFile] = None
+
+
+def _open_worker_archive(zip_path: str) -> None:
+    """ワーカープロセスでzipを開く（プロセスプールのinitializer）"""
+    global _worker_archive
+    _worker_archive = zipfile.ZipFile(zip_path)
+
+
+def _decode_day_files(entries: List[Tuple[str, str]]) -> Tuple[List[MessageTuple], List[str]]:
+    """日別JSONを読み込み、デコードしてメッセージのタプルに正規化する（ワーカープロセスで実行）
+
+    zipの読み出し・展開もワーカー側で行い、親プロセスとの受け渡しは小さなタプルのみにする。
+    壊れたファイルは読み飛ばし、取り込み全体は止めない。
+
+    Args:
+        entries: (エントリ名, チャンネル名) のリスト
+
+    Returns:
+        Tuple[List[MessageTuple], List[str]]: (channel, ts, user, user_name, text, thread_ts) のリストと
+            読み込めなかったエントリ名のリスト
+    """
+    records = []
+    skipped = []
+    for name, channel in entries:
+        try:
+            day = _loads(_worker_archive.read(name))
+        except Exception as e:
+            logger.warning(f"Skipped unreadable day file {name}: {str(e)}")
+            skipped.append(name)
+            continue
+        if not isinstance(day, list):
+            logger.warning(f"Skipped day file {name}: expected a list of messages")
+            skipped.append(name)
+            continue
+        for raw in day:
+            if not isinstance(raw, dict) or raw.get("subtype") in SKIPPED_SUBTYPES:
+                continue
+            text = raw.get("text")
+            ts = raw.get("ts")
+            if not text or not ts:
+                continue
+            profile = raw.get("user_profile") or {}
+            records.append((
+                channel,
+                ts,
+                raw.get("user") or raw.get("bot_id"),
+                profile.get("display_name") or profile.get("real_name") or raw.get("username"),
+                text,
+                raw.get("thread_ts"),
+            ))
+    return records, skipped
+
+
+def _to_messages(records: List[MessageTuple]) -> Iterator[SlackMessage]:
+    """メッセージのタプルをレコードに変換する"""
+    for channel, ts, user, user_name, text, thread_ts in records:
+        # pydantic v2ではmodel_constructより通常の初期化（Rust側での検証）の方が速い
+        yield SlackMessage(
+            channel=channel, ts=ts, user=user, user_name=user_name, text=text, thread_ts=thread_ts
+        )
+
+
+def _collect_messages(
+    zip_path: str,
+    batches: List[List[Tuple[str, str]]],
+    messages: List[SlackMessage],
+    max_workers: int,
+    max_in_flight: int
+) -> List[str]:
+    """バッチをデコードしてmessagesに追加する（max_workersが1ならプロセスプールを使わない）
+
+    Returns:
+        List[str]: 読み込めなかった日別JSONのエントリ名
+    """
+    global _worker_archive
+    skipped_files: List[str] = []
+
+    def collect(result: Tuple[List[MessageTuple], List[str]]) -> None:
+        records, skipped = result
+        messages.extend(_to_messages(records))
+        skipped_files.extend(skipped)
+
+    if max_workers == 1:
+        _open_worker_archive(zip_path)
+        try:
+            for batch in batches:
+                collect(_decode_day_files(batch))
+        finally:
+            _worker_archive.close()
+            _worker_archive = None
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_open_worker_archive,
+            initargs=(zip_path,)
+        ) as executor:
+            pending = deque()
+            for batch in batches:
+                # 投入数を制限し、完了順ではなく投入順に結果を取り出す
+                if len(pending) >= max_in_flight:
+                    collect(pending.popleft().result())
+                pending.append(executor.submit(_decode_day_files, batch))
+            while pending:
+                collect(pending.popleft().result())
+    return skipped_files
+
+
+def import_slack_export(
+    zip_path: str,
+    max_workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    batch_bytes: int = 8 * 1024 * 1024,
+    directory: Optional[SlackDirectory] = None
+) -> Dict[str, Any]:
+    """Slackワークスペースのエクスポート（zip）を読み込む
+
+    zipはディスクに展開せずにエントリ単位で読み出す。日別JSONはバッチにまとめて
+    プロセスプールに渡し、各ワーカーが自分でzipを開いて読み出し・展開・デコードを行う。
+    max_workersが1の場合はプロセスプールを使わずに同じ処理を順に実行する。
+
+    Args:
+        zip_path: エクスポートzipのパス
+        max_workers: ワーカープロセス数（省略時はCPUコア数）
+        max_in_flight: 同時に投入するバッチ数の上限（メモリ使用量の制限）
+        batch_bytes: 1バッチあたりの展開後サイズの目安
+        directory: 指定時はエクスポートのusers.json・channels.jsonを登録する
+
+    Returns:
+        Dict[str, Any]: メッセージと処理統計（読み込めなかった日別JSONはskipped_files）
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or max_workers * 2
+
+    start = time.perf_counter()
+    messages: List[SlackMessage] = []
+
+    with zipfile.ZipFile(zip_path) as archive:
+        if directory is not None:
+            names = set(archive.namelist())
+            if "users.json" in names:
+                directory.load_users(_loads(archive.read("users.json")))
+            if "channels.json" in names:
+                directory.load_channels(_loads(archive.read("channels.json")))
+            directory.save()
+        batches = list(_iter_day_batches(archive, batch_bytes))
+    file_count = sum(len(batch) for batch in batches)
+
+    # 大量のレコードを作る間は循環参照GCの走査が支配的になるため一時的に止める
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        skipped_files = _collect_messages(zip_path, batches, messages, max_workers, max_in_flight)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    messages.sort(key=lambda m: (m.channel, float(m.ts)))
+
+    elapsed = time.perf_counter() - start
+    throughput = len(messages) / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        f"Imported {len(messages)} messages from {file_count} files "
+        f"in {elapsed:.2f}s ({throughput:.0f} messages/s, {max_workers} workers)"
+    )
+    if skipped_files:
+        logger.warning(f"Skipped {len(skipped_files)} unreadable day files: {', '.join(skipped_files[:10])}")
+
+    return {
+        "messages": messages,
+        "file_count": file_count,
+        "skipped_files": skipped_files,
+        "message_count": len(messages),
+        "elapsed_seconds": elapsed,
+        "messages_per_second": throughput
+    }
+
+
+def format_messages(messages: List[SlackMessage]) -> str:
+    """メッセージレコードを要約用のテキストに整形する
+
+    Args:
+        messages: メッセージレコード
+
+    Returns:
+        str: 1行1メッセージのテキスト
+    """
+    lines = []
+    for m in messages:
+        posted_at = datetime.fromtimestamp(float(m.ts)).strftime("%Y-%m-%d %H:%M")
+        author = m.user_name or m.user or "unknown"
+        prefix = "  ↳ " if m.thread_ts and m.thread_ts != m.ts else ""
+        lines.append(f"{prefix}[{posted_at}] #{m.channel} {author}: {m.text}")
+    return "\n".join(lines)
@@ -0,0 +1,104 @@
+import math
+import time
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.output_parsers import StrOutputParser
+
+import src.nodes.discussion_extractor as discussion_extractor
+from src.loadtest.fake_model import FakeChatModel
+from src.loadtest.local_prompt_cache import LocalPromptCache
+from src.utils.prompt_cache import PromptUsageTracker, build_chain
+
+SYSTEM_PROMPT = "あなたはSlackログを要約するアシスタントです。" * 20
+
+
+class CountingPromptCache(LocalPromptCache):
+    """登録・延長の回数を数え、有効期限を指定できるキャッシュ"""
+
+    def __init__(self, lifetime_seconds=math.inf, fail=False, **kwargs):
+        super().__init__(**kwargs)
+        self.lifetime_seconds = lifetime_seconds
+        self.fail = fail
+        self.created = 0
+        self.refreshed = 0
+
+    def _create(self, llm, system_prompt):
+        if self.fail:
+            raise RuntimeError("registration failed")
+        self.created += 1
+        handle, _ = super()._create(llm, system_prompt)
+        return f"{handle}-{self.created}", time.time() + self.lifetime_seconds
+
+    def _refresh(self, llm, system_prompt, handle):
+        self.refreshed += 1
+        return handle, time.time() + self.lifetime_seconds
+
+
+def _build(cache, tracker):
+    return build_chain(
+        "node",
+        FakeChatModel(latency_seconds=0),
+        SYSTEM_PROMPT,
+        "以下の会話ログを要約してください: {text}",
+        StrOutputParser(),
+        prompt_cache=cache,
+        usage_tracker=tracker
+    )
+
+
+def test_chain_is_built_once_and_prompt_registered_once(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    built = []
+
+    def counting_build_chain(*args, **kwargs):
+        built.append(1)
+        return build_chain(*args, **kwargs)
+
+    monkeypatch.setattr(discussion_extractor, "build_chain", counting_build_chain)
+    cache = CountingPromptCache()
+    tracker = PromptUsageTracker()
+    extractor = discussion_extractor.DiscussionExtractor(
+        FakeChatModel(latency_seconds=0), prompt_cache=cache, usage_tracker=tracker
+    )
+
+    for _ in range(3):
+        extractor.run("要約")
+
+    assert len(built) == 1
+    assert cache.created == 1
+    usage = next(iter(tracker.usage.values()))
+    assert usage["calls"] == 3
+    assert usage["cached_input_tokens"] > 0
+
+
+def test_handle_is_refreshed_near_expiry():
+    cache = CountingPromptCache(lifetime_seconds=1.0, refresh_margin_seconds=0.9)
+    chain = _build(cache, PromptUsageTracker())
+
+    chain.invoke({"text": "a"})
+    assert (cache.created, cache.refreshed) == (1, 0)
+
+    time.sleep(0.15)
+    chain.invoke({"text": "b"})
+    assert (cache.created, cache.refreshed) == (1, 1)
+
+
+def test_prompt_is_sent_inline_when_registration_fails():
+    cache = CountingPromptCache(fail=True, retry_seconds=60)
+    tracker = PromptUsageTracker()
+    chain = _build(cache, tracker)
+
+    outputs = chain.batch([{"text": "a"}, {"text": "b"}])
+
+    assert len(outputs) == 2
+    usage = tracker.usage["node"]
+    assert usage["calls"] == 2
+    assert usage["cached_input_tokens"] == 0
+    # システムプロンプトも入力として送られている
+    assert usage["input_tokens"] > 2 * len(SYSTEM_PROMPT) // 4
+
+
+def test_local_prompt_cache_rejects_real_models():
+    with pytest.raises(TypeError):
+        LocalPromptCache().bind(FakeListChatModel(responses=["ok"]), SYSTEM_PROMPT)
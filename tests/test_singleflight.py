@@ -0,0 +1,97 @@
+import threading
+import time
+
+from src.utils.singleflight import SingleFlight
+
+
+def _run_concurrently(singleflight, key, fn, count):
+    """同じキーでcount件を同時に呼び出し、結果（または例外）を返す"""
+    results = [None] * count
+
+    def call(i):
+        try:
+            results[i] = singleflight.do(key, fn)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+    return results
+
+
+def test_followers_share_leader_result():
+    singleflight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fn():
+        calls.append(1)
+        release.wait(timeout=5)
+        return {"value": 42}
+
+    timer = threading.Timer(0.2, release.set)
+    timer.start()
+    results = _run_concurrently(singleflight, "key", fn, 4)
+    timer.cancel()
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert results[0] == {"value": 42}
+
+
+def test_exception_reaches_all_waiters():
+    singleflight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fn():
+        calls.append(1)
+        release.wait(timeout=5)
+        raise ValueError("boom")
+
+    timer = threading.Timer(0.2, release.set)
+    timer.start()
+    results = _run_concurrently(singleflight, "key", fn, 4)
+    timer.cancel()
+
+    assert len(calls) == 1
+    assert all(isinstance(r, ValueError) and str(r) == "boom" for r in results)
+
+    # 失敗した結果はキャッシュされず、次の呼び出しで再実行される
+    assert singleflight.do("key", lambda: "ok") == "ok"
+
+
+def test_uncacheable_result_is_not_cached():
+    singleflight = SingleFlight(ttl_seconds=60)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return {"slack_success": len(calls) > 1}
+
+    assert singleflight.do("key", fn, cacheable=lambda r: r["slack_success"]) == {"slack_success": False}
+    assert singleflight.do("key", fn, cacheable=lambda r: r["slack_success"]) == {"slack_success": True}
+    assert singleflight.do("key", fn, cacheable=lambda r: r["slack_success"]) == {"slack_success": True}
+    assert len(calls) == 2
+
+
+def test_cache_expires_after_ttl():
+    singleflight = SingleFlight(ttl_seconds=0.1)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return len(calls)
+
+    assert singleflight.do("key", fn) == 1
+    assert singleflight.do("key", fn) == 1
+    time.sleep(0.15)
+    assert singleflight.do("key", fn) == 2
+
+
+def test_zero_ttl_disables_cache():
+    singleflight = SingleFlight(ttl_seconds=0)
+    assert singleflight.do("key", lambda: object()) is not singleflight.do("key", lambda: object())